@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# append-only analysis history: one JSON line per orchestrator result, indexed in memory by dog and time.
+# per-dog trend aggregates are folded in as each record is written, so reading them never rescans the log;
+# the log is only replayed once, at startup
+
+HISTORY_PATH = os.environ.get('AI_HISTORY_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'analysis_history.jsonl'))
+HISTORY_FSYNC = os.environ.get('AI_HISTORY_FSYNC', '0') == '1'
+# weight of the newest severity score in the per-dog rolling (exponentially weighted) average
+HISTORY_SEVERITY_ALPHA = float(os.environ.get('AI_HISTORY_SEVERITY_ALPHA', '0.3'))
+HISTORY_RECURRING_MIN = int(os.environ.get('AI_HISTORY_RECURRING_MIN', '2'))
+
+URGENCY_LEVELS = ('low', 'moderate', 'high')
+RECORD_FIELDS = {'dog_id', 'recorded_at', 'summary', 'result'}
+
+logger = logging.getLogger(__name__)
+
+def summarize(result: Dict) -> Dict:
+    # the fields the trend aggregates are built from, for any orchestrator result shape
+    summary = {'kind': result.get('type', 'multimodal'), 'status': result.get('status', 'success'), 'diagnoses': [], 'urgency': None, 'severity': None}
+    if summary['status'] != 'success':
+        return summary
+
+    if 'comprehensive_report' in result:
+        report = result['comprehensive_report']
+        summary['diagnoses'] = [diagnosis['diagnosis'] for diagnosis in report.get('primary_diagnoses', [])]
+        summary['urgency'] = report.get('urgency_level')
+        text_analysis = result.get('individual_results', {}).get('text_analysis')
+        if text_analysis and text_analysis.get('status') == 'success':
+            summary['severity'] = text_analysis['data'].get('severity', {}).get('score')
+        return summary
+
+    for data in result.get('files', [result.get('data') or {}]):
+        if summary['kind'] == 'text':
+            summary['diagnoses'].append(data.get('top_disease'))
+            summary['severity'] = data.get('severity', {}).get('score')
+            summary['urgency'] = 'high' if data.get('urgent_care') else 'low'
+        elif summary['kind'] == 'image':
+            medical_advice = data.get('medical_advice', {})
+            summary['diagnoses'].append(medical_advice.get('diagnosis'))
+            urgency = 'high' if medical_advice.get('is_emergency') else medical_advice.get('urgency_level')
+            # the most urgent image sets the analysis urgency
+            summary['urgency'] = max(summary['urgency'] or 'low', urgency if urgency in URGENCY_LEVELS else 'low', key=URGENCY_LEVELS.index)
+        else:
+            summary['diagnoses'].append(data.get('top_disease'))
+    summary['diagnoses'] = [diagnosis for diagnosis in summary['diagnoses'] if diagnosis]
+    return summary
+
+class AnalysisHistory:
+    def __init__(self, path: str = HISTORY_PATH, fsync: bool = HISTORY_FSYNC,
+                 severity_alpha: float = HISTORY_SEVERITY_ALPHA, recurring_min: int = HISTORY_RECURRING_MIN):
+        self.path = path
+        self.fsync = fsync
+        self.severity_alpha = severity_alpha
+        self.recurring_min = recurring_min
+        self._lock = threading.Lock()
+        self._dogs = {}
+        self._records = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._size = self._replay()
+        self._writer = open(path, 'ab')
+        self._reader = os.open(path, os.O_RDONLY)
+
+    def _replay(self) -> int:
+        # rebuilds the index and aggregates. Only a torn final line (no trailing newline, from a crash
+        # mid-append) is cut off; a damaged complete line is skipped, so the records after it survive
+        if not os.path.exists(self.path):
+            return 0
+
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    logger.warning(f"Truncating incomplete history record at offset {offset}")
+                    break
+                try:
+                    record = json.loads(line)
+                    if not isinstance(record, dict) or not RECORD_FIELDS <= record.keys():
+                        raise ValueError('missing fields')
+                except ValueError:
+                    logger.warning(f"Skipping unreadable history record at offset {offset}")
+                else:
+                    self._index(record, offset, len(line))
+                offset += len(line)
+
+        if offset != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+        return offset
+
+    def _dog(self, dog_id: str) -> Dict:
+        dog = self._dogs.get(dog_id)
+        if dog is None:
+            dog = self._dogs[dog_id] = {
+                'times': [],
+                'locations': [],
+                'aggregate': {
+                    'analyses': 0,
+                    'errors': 0,
+                    'first_analysis_at': None,
+                    'last_analysis_at': None,
+                    'rolling_severity': None,
+                    'latest_severity': None,
+                    'urgency_counts': {},
+                    'analysis_counts': {},
+                    'diagnosis_counts': {}
+                }
+            }
+        return dog
+
+    def _index(self, record: Dict, offset: int, length: int) -> None:
+        dog = self._dog(record['dog_id'])
+        # whole microseconds, so an ISO timestamp handed back as a `before` cursor compares exactly
+        dog['times'].append(round(record['recorded_at'] * 1e6))
+        dog['locations'].append((offset, length))
+        self._records += 1
+
+        aggregate = dog['aggregate']
+        summary = record['summary']
+        aggregate['analyses'] += 1
+        if aggregate['first_analysis_at'] is None:
+            aggregate['first_analysis_at'] = record['recorded_at']
+        aggregate['last_analysis_at'] = record['recorded_at']
+        aggregate['analysis_counts'][summary['kind']] = aggregate['analysis_counts'].get(summary['kind'], 0) + 1
+        if summary['status'] != 'success':
+            aggregate['errors'] += 1
+            return
+
+        if summary['severity'] is not None:
+            previous = aggregate['rolling_severity']
+            aggregate['latest_severity'] = summary['severity']
+            aggregate['rolling_severity'] = summary['severity'] if previous is None else (
+                self.severity_alpha * summary['severity'] + (1 - self.severity_alpha) * previous
+            )
+        if summary['urgency']:
+            aggregate['urgency_counts'][summary['urgency']] = aggregate['urgency_counts'].get(summary['urgency'], 0) + 1
+        # a diagnosis recurs across analyses, so several files of one analysis agreeing count once
+        for diagnosis in set(summary['diagnoses']):
+            aggregate['diagnosis_counts'][diagnosis] = aggregate['diagnosis_counts'].get(diagnosis, 0) + 1
+
+    def record(self, dog_id: str, result: Dict) -> Dict:
+        with self._lock:
+            dog = self._dog(str(dog_id))
+            # kept non-decreasing per dog so the time index stays sorted even if the clock steps back
+            recorded_at = round(max(time.time(), dog['times'][-1] / 1e6 if dog['times'] else 0.0), 6)
+            record = {
+                'dog_id': str(dog_id),
+                'recorded_at': recorded_at,
+                'summary': summarize(result),
+                'result': result
+            }
+            line = (json.dumps(record, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+            self._writer.write(line)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+            self._index(record, self._size, len(line))
+            self._size += len(line)
+        return record
+
+    def history(self, dog_id: str, limit: int = 20, before: float = None, include_results: bool = True) -> List[Dict]:
+        # newest first; `before` is a unix timestamp, found by bisecting the dog's time index
+        with self._lock:
+            dog = self._dogs.get(str(dog_id))
+            if dog is None:
+                return []
+            end = len(dog['times']) if before is None else bisect.bisect_left(dog['times'], round(before * 1e6))
+            locations = dog['locations'][max(0, end - limit):end]
+
+        records = []
+        for offset, length in reversed(locations):
+            record = json.loads(os.pread(self._reader, length, offset))
+            record['recorded_at'] = datetime.fromtimestamp(record['recorded_at']).isoformat()
+            if not include_results:
+                del record['result']
+            records.append(record)
+        return records
+
+    def trends(self, dog_id: str) -> Optional[Dict]:
+        with self._lock:
+            dog = self._dogs.get(str(dog_id))
+            if dog is None:
+                return None
+            aggregate = dict(dog['aggregate'], **{
+                key: dict(dog['aggregate'][key]) for key in ('urgency_counts', 'analysis_counts', 'diagnosis_counts')
+            })
+
+        for key in ('first_analysis_at', 'last_analysis_at'):
+            aggregate[key] = datetime.fromtimestamp(aggregate[key]).isoformat()
+        aggregate['recurring_diagnoses'] = sorted(
+            ({'diagnosis': diagnosis, 'count': count} for diagnosis, count in aggregate['diagnosis_counts'].items() if count >= self.recurring_min),
+            key=lambda entry: -entry['count']
+        )
+        return aggregate
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'path': self.path,
+                'records': self._records,
+                'dogs': len(self._dogs),
+                'bytes': self._size
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._writer.close()
+            os.close(self._reader)
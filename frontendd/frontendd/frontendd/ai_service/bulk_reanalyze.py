@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(base_dir)
+from model_runtime.loading import load_model_class
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.aac', '.ogg', '.flac')
+
+class ResultWriter:
+    # appends results incrementally and records finished ids in a checkpoint file so a rerun can resume
+    def __init__(self, output_path, output_format, resume):
+        self.output_path = output_path
+        self.output_format = output_format
+        self.checkpoint_path = output_path + '.checkpoint'
+        self.done = set()
+        self.part = 0
+
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r') as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        elif not resume:
+            for path in (self.output_path, self.checkpoint_path):
+                if os.path.isfile(path):
+                    os.unlink(path)
+
+        if output_format == 'parquet':
+            import pyarrow
+            import pyarrow.parquet
+            self.pyarrow = pyarrow
+            os.makedirs(output_path, exist_ok=True)
+            if not resume:
+                for name in os.listdir(output_path):
+                    if name.endswith('.parquet'):
+                        os.unlink(os.path.join(output_path, name))
+            self.part = len([name for name in os.listdir(output_path) if name.endswith('.parquet')])
+
+        self.checkpoint = open(self.checkpoint_path, 'a')
+
+    def write(self, records):
+        if not records:
+            return
+
+        if self.output_format == 'parquet':
+            # every flush becomes its own part file, so earlier parts are never rewritten
+            table = self.pyarrow.Table.from_pylist([
+                {**record, 'result': json.dumps(record['result'])} for record in records
+            ])
+            self.pyarrow.parquet.write_table(table, os.path.join(self.output_path, f'part-{self.part:05d}.parquet'))
+            self.part += 1
+        else:
+            with open(self.output_path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+
+        # checkpointing only after the results are durable
+        for record in records:
+            self.checkpoint.write(record['id'] + '\n')
+            self.done.add(record['id'])
+        self.checkpoint.flush()
+
+    def close(self):
+        self.checkpoint.close()
+
+class Throughput:
+    def __init__(self):
+        self.stats = {}
+
+    def begin(self, modality):
+        now = time.time()
+        self.stats[modality] = {
+            'items': 0, 'errors': 0, 'decode_seconds': 0.0, 'model_seconds': 0.0, 'start': now, 'end': now
+        }
+
+    def record(self, modality, items, errors, decode_seconds, model_seconds):
+        stats = self.stats[modality]
+        stats['items'] += items
+        stats['errors'] += errors
+        stats['decode_seconds'] += decode_seconds
+        stats['model_seconds'] += model_seconds
+        stats['end'] = time.time()
+
+    def report(self):
+        report = {}
+        for modality, stats in self.stats.items():
+            elapsed = stats['end'] - stats['start']
+            report[modality] = {
+                'items': stats['items'],
+                'errors': stats['errors'],
+                'elapsed_seconds': round(elapsed, 2),
+                'items_per_second': round(stats['items'] / elapsed, 2) if elapsed > 0 else None,
+                'decode_seconds': round(stats['decode_seconds'], 2),
+                'model_seconds': round(stats['model_seconds'], 2)
+            }
+        return report
+
+def list_files(directory, extensions):
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(extensions)
+    )
+
+def read_texts(path):
+    # one JSON object per line with id and symptom_text, plus optional breed, age and sex
+    # (e.g. exported from the healthlogs collection with mongoexport)
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                record.setdefault('id', f'line-{line_number}')
+                yield record
+
+def batched(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def decode_stream(executor, items, decode, batch_size, prefetch):
+    # decoding runs ahead of the model by up to `prefetch` batches on the worker pool
+    pending = []
+    for batch in batched(items, batch_size):
+        pending.append((batch, [executor.submit(timed, decode, item) for item in batch]))
+        if len(pending) > prefetch:
+            yield collect(pending.pop(0))
+    while pending:
+        yield collect(pending.pop(0))
+
+def timed(fn, item):
+    start = time.perf_counter()
+    try:
+        return fn(item), None, time.perf_counter() - start
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+
+def collect(entry):
+    batch, futures = entry
+    return batch, [future.result() for future in futures]
+
+def run_images(predictor, paths, writer, executor, args, throughput, model_version):
+    import torch
+
+    def decode(path):
+        with open(path, 'rb') as f:
+            return predictor.preprocess(f.read())
+
+    throughput.begin('image')
+    items = [path for path in paths if f'image:{path}' not in writer.done]
+    for batch, decoded in decode_stream(executor, items, decode, args.batch_size, args.prefetch):
+        records = []
+        valid = [(path, tensor) for path, (tensor, error, _) in zip(batch, decoded) if error is None]
+        for path, (tensor, error, _) in zip(batch, decoded):
+            if error is not None:
+                records.append({'id': f'image:{path}', 'modality': 'image', 'source': path,
+                                'model_version': model_version, 'result': {'error': error}})
+
+        start = time.perf_counter()
+        if valid:
+            batch_predictions = predictor.predict_tensors(torch.stack([tensor for _, tensor in valid]))
+            for (path, _), predictions in zip(valid, batch_predictions):
+                records.append({'id': f'image:{path}', 'modality': 'image', 'source': path,
+                                'model_version': model_version,
+                                'result': predictor.report_from_predictions(predictions)})
+        model_seconds = time.perf_counter() - start
+
+        writer.write(records)
+        throughput.record('image', len(batch), len(batch) - len(valid), sum(d[2] for d in decoded), model_seconds)
+
+def run_audio(classifier, paths, writer, executor, args, throughput, model_version):
+    import numpy as np
+
+    throughput.begin('audio')
+    items = [path for path in paths if f'audio:{path}' not in writer.done]
+    for batch, decoded in decode_stream(executor, items, classifier.preprocess_audio, args.batch_size, args.prefetch):
+        records = []
+        valid = [(path, waveform) for path, (waveform, error, _) in zip(batch, decoded) if error is None]
+        for path, (waveform, error, _) in zip(batch, decoded):
+            if error is not None:
+                records.append({'id': f'audio:{path}', 'modality': 'audio', 'source': path,
+                                'model_version': model_version,
+                                'result': {'error': f'Audio processing error: {error}', 'status': 'error'}})
+
+        start = time.perf_counter()
+        if valid:
+            batch_predictions = classifier.predict_waveforms(np.stack([waveform for _, waveform in valid]))
+            for (path, _), prediction in zip(valid, batch_predictions):
+                records.append({'id': f'audio:{path}', 'modality': 'audio', 'source': path,
+                                'model_version': model_version, 'result': prediction})
+        model_seconds = time.perf_counter() - start
+
+        writer.write(records)
+        throughput.record('audio', len(batch), len(batch) - len(valid), sum(d[2] for d in decoded), model_seconds)
+
+def run_texts(classifier, records_iter, writer, args, throughput, model_version):
+    throughput.begin('text')
+    items = (record for record in records_iter if f"text:{record['id']}" not in writer.done)
+    for batch in batched(items, args.batch_size):
+        start = time.perf_counter()
+        results = classifier.predict_batch(batch)
+        model_seconds = time.perf_counter() - start
+
+        writer.write([
+            {'id': f"text:{record['id']}", 'modality': 'text', 'source': record['id'],
+             'model_version': model_version, 'result': result}
+            for record, result in zip(batch, results)
+        ])
+        throughput.record('text', len(batch), 0, 0.0, model_seconds)
+
+def model_version(model_path):
+    try:
+        with open(os.path.join(model_path, 'model_config.json'), 'r') as f:
+            return json.load(f).get('version', 'v1.0')
+    except (OSError, ValueError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-run stored uploads and symptom texts through the models in bulk')
+    parser.add_argument('--images', default=os.path.join(base_dir, 'public', 'uploads', 'images'),
+                        help='directory of stored images (empty string to skip)')
+    parser.add_argument('--audio', default=os.path.join(base_dir, 'public', 'uploads', 'audio'),
+                        help='directory of stored recordings (empty string to skip)')
+    parser.add_argument('--texts', default=None, help='JSONL file of symptom texts to score')
+    parser.add_argument('--text-assets', default=os.path.join(base_dir, 'textmodelW', 'model_assets'))
+    parser.add_argument('--audio-assets', default=os.path.join(base_dir, 'audiomodelW', 'audio_model_assets'))
+    parser.add_argument('--image-assets', default=os.path.join(base_dir, 'imagemodelW', 'model_assets'))
+    parser.add_argument('--output', required=True, help='JSONL file, or directory of part files for parquet')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='parallel decode workers')
+    parser.add_argument('--prefetch', type=int, default=2, help='batches decoded ahead of the model')
+    parser.add_argument('--resume', action='store_true', help='skip inputs recorded in the checkpoint file')
+    args = parser.parse_args()
+
+    writer = ResultWriter(args.output, args.format, args.resume)
+    throughput = Throughput()
+
+    # decoding (PIL, soundfile, soxr) releases the GIL, so a thread pool keeps the cores busy
+    # while the models see each batch in one forward pass
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='decode') as executor:
+        try:
+            image_paths = list_files(args.images, IMAGE_EXTENSIONS)
+            if image_paths:
+                SkinDiseasePredictor = load_model_class('image', args.image_assets)
+                predictor = SkinDiseasePredictor(args.image_assets)
+                run_images(predictor, image_paths, writer, executor, args, throughput, model_version(args.image_assets))
+                del predictor
+
+            audio_paths = list_files(args.audio, AUDIO_EXTENSIONS)
+            if audio_paths:
+                DogAudioClassifier = load_model_class('audio', args.audio_assets)
+                classifier = DogAudioClassifier(args.audio_assets)
+                run_audio(classifier, audio_paths, writer, executor, args, throughput, model_version(args.audio_assets))
+                del classifier
+
+            if args.texts:
+                DogDiseaseClassifier = load_model_class('text', args.text_assets)
+                classifier = DogDiseaseClassifier(args.text_assets)
+                run_texts(classifier, read_texts(args.texts), writer, args, throughput, model_version(args.text_assets))
+                del classifier
+        finally:
+            writer.close()
+
+    report = throughput.report()
+    print(json.dumps(report, indent=2))
+    with open(args.output.rstrip('/') + '.report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_SYMPTOMS = [
+    'My dog has been vomiting and has diarrhea since yesterday',
+    'Scratching a lot, red patches and hair loss on the belly',
+    'Coughing at night and seems tired after short walks',
+    'Limping on the back left leg, swelling around the knee',
+    'Not eating, drinking a lot of water and urinating often',
+    'Bleeding from the mouth and having trouble breathing'
+]
+# replaced with a per-request counter when sending, so identical requests are neither collapsed by
+# single-flight nor served from the tokenization cache; without it the harness measures deduplication
+NONCE = b'@nonce@'
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in ('text', 'image', 'audio', 'comprehensive'):
+            raise argparse.ArgumentTypeError(f'unknown request kind: {kind}')
+        mix[kind] = float(weight or 1)
+    return mix
+
+def parse_rates(value):
+    return [float(rate) for rate in value.split(',')]
+
+def multipart_body(fields, files):
+    boundary = f'----pawlytics{random.getrandbits(64):016x}'
+    lines = []
+    for name, value in fields.items():
+        lines.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for name, (filename, data) in files.items():
+        lines.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8') + data + b'\r\n')
+    lines.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(lines), f'multipart/form-data; boundary={boundary}'
+
+def read_samples(directory, limit=20):
+    samples = []
+    if directory and os.path.isdir(directory):
+        for name in sorted(os.listdir(directory))[:limit]:
+            with open(os.path.join(directory, name), 'rb') as f:
+                samples.append((name, f.read()))
+    return samples
+
+def build_requests(kind, images, audio, unique=True):
+    # every request is pre-encoded so the harness spends no time building bodies while it is timing;
+    # `unique` tags the symptom text with NONCE (audio requests have no text, so only --no-single-flight separates them)
+    requests = []
+    case = f" (case {NONCE.decode('utf-8')})" if unique else ''
+    if kind == 'text':
+        for symptoms in SAMPLE_SYMPTOMS:
+            body = json.dumps({'symptom_text': symptoms + case, 'breed': 'Labrador', 'age': 5, 'sex': 'male'}).encode('utf-8')
+            requests.append(('/analyze/text', body, 'application/json'))
+    elif kind == 'image':
+        for name, data in images:
+            body, content_type = multipart_body({'symptoms': random.choice(SAMPLE_SYMPTOMS) + case}, {'image': (name, data)})
+            requests.append(('/analyze/image', body, content_type))
+    elif kind == 'audio':
+        for name, data in audio:
+            body, content_type = multipart_body({}, {'audio': (name, data)})
+            requests.append(('/analyze/audio', body, content_type))
+    elif kind == 'comprehensive':
+        for index, symptoms in enumerate(SAMPLE_SYMPTOMS):
+            files = {}
+            if images:
+                files['image'] = images[index % len(images)]
+            if audio:
+                files['audio'] = audio[index % len(audio)]
+            body, content_type = multipart_body({'symptom_text': symptoms + case, 'breed': 'Labrador', 'age': 5}, files)
+            requests.append(('/analyze/comprehensive', body, content_type))
+    return requests
+
+class InProcessClient:
+    # Flask test client: measures the orchestrator itself without socket or HTTP parsing overhead
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def send(self, path, body, content_type):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.post(path, data=body, content_type=content_type)
+        return response.status_code
+
+    def close(self):
+        pass
+
+class HTTPClient:
+    # a real werkzeug server on an ephemeral loopback port, one keep-alive connection per worker thread
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.local = threading.local()
+
+    def send(self, path, body, content_type):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        try:
+            connection.request('POST', path, body=body, headers={'Content-Type': content_type})
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self.local.connection = None
+            raise
+
+    def close(self):
+        self.server.shutdown()
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(latencies):
+    return {
+        'count': len(latencies),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': max(latencies) if latencies else None
+    }
+
+def single_flight_delta(before, after):
+    # executed vs collapsed calls per model during one step; collapsed ones never reached a model
+    delta = {}
+    for kind, counts in after['by_type'].items():
+        previous = before['by_type'].get(kind, {})
+        delta[kind] = {key: value - previous.get(key, 0) for key, value in counts.items()}
+    return delta
+
+def run_step(client, requests_by_kind, mix, rate, duration, concurrency, rng, sequence):
+    # open-loop Poisson arrivals; latency counts from the scheduled arrival, so queueing shows up in the tail
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    results = []
+    results_lock = threading.Lock()
+
+    def issue(kind, request, scheduled, number):
+        path, body, content_type = request
+        if NONCE in body:
+            body = body.replace(NONCE, f'{number:07x}'.encode('utf-8'), 1)
+        try:
+            status = client.send(path, body, content_type)
+            error = status >= 400
+        except Exception:
+            status, error = None, True
+        finished = time.perf_counter()
+        with results_lock:
+            results.append((kind, (finished - scheduled) * 1000, error, status))
+
+    start = time.perf_counter()
+    arrival = start
+    sent = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load') as executor:
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival - start >= duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind = rng.choices(kinds, weights)[0]
+            executor.submit(issue, kind, rng.choice(requests_by_kind[kind]), arrival, next(sequence))
+            sent += 1
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for _, latency, error, _ in results if not error]
+    errors = sum(1 for result in results if result[2])
+    per_kind = {}
+    for kind in kinds:
+        kind_results = [r for r in results if r[0] == kind]
+        per_kind[kind] = {
+            **latency_summary([r[1] for r in kind_results if not r[2]]),
+            'errors': sum(1 for r in kind_results if r[2])
+        }
+
+    return {
+        'offered_rps': rate,
+        'sent': sent,
+        'sent_rps': round(sent / duration, 2),
+        'completed': len(results),
+        'achieved_rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        'error_rate': round(errors / len(results), 4) if results else 0.0,
+        'status_codes': {str(code): sum(1 for r in results if r[3] == code) for code in sorted({r[3] for r in results}, key=str)},
+        'latency': latency_summary(latencies),
+        'by_kind': per_kind,
+        'elapsed_seconds': round(elapsed, 2)
+    }
+
+def is_saturated(step, slo_ms, max_error_rate):
+    # compared with what was actually sent, since a short Poisson step rarely hits the nominal rate exactly
+    achieved = step['achieved_rps'] or 0
+    p99 = step['latency']['p99_ms']
+    return (achieved < 0.9 * step['sent_rps']
+            or step['error_rate'] > max_error_rate
+            or (slo_ms is not None and p99 is not None and p99 > slo_ms))
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a traffic mix against a local orchestrator and report throughput, tail latency and saturation')
+    parser.add_argument('--mode', choices=['inprocess', 'http'], default='http',
+                        help='call the Flask app directly, or through a local threaded HTTP server')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('text=0.6,image=0.3,audio=0.1'),
+                        help='request kinds and weights, e.g. text=0.6,image=0.3,audio=0.1,comprehensive=0')
+    parser.add_argument('--rates', type=parse_rates, default=parse_rates('1,2,5,10,20'),
+                        help='comma-separated arrival rates (requests/second) swept in order')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per rate step')
+    parser.add_argument('--warmup', type=int, default=3, help='requests of each kind sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=32, help='maximum requests in flight')
+    parser.add_argument('--images', default=os.path.join(base_dir, 'public', 'uploads', 'images'))
+    parser.add_argument('--audio', default=os.path.join(base_dir, 'public', 'uploads', 'audio'))
+    parser.add_argument('--split', action='store_true', help='serve models from per-framework worker processes (sets AI_SPLIT_WORKERS)')
+    parser.add_argument('--stub', action='store_true', help='serve framework-free stub models (sets AI_STUB_MODELS)')
+    parser.add_argument('--repeat-payloads', action='store_true',
+                        help='send the same bodies over and over instead of unique ones, to measure request collapsing and caching')
+    parser.add_argument('--no-single-flight', action='store_true', help='run every request on a model, even identical ones (sets AI_SINGLE_FLIGHT=0)')
+    parser.add_argument('--stub-latency-ms', default=None, help='stub model latency, e.g. 20 or text=5,image=40,audio=60')
+    parser.add_argument('--torch-threads', type=int, default=None, help='intra-op threads for PyTorch (OMP/MKL)')
+    parser.add_argument('--tf-threads', type=int, default=None, help='intra-op threads for TensorFlow')
+    parser.add_argument('--slo-ms', type=float, default=None, help='p99 latency objective used for the saturation point')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='write the report as JSON to this path')
+    args = parser.parse_args()
+
+    # everything that shapes the model runtimes has to be in the environment before the orchestrator is imported
+    if args.split:
+        os.environ['AI_SPLIT_WORKERS'] = '1'
+    if args.stub:
+        os.environ['AI_STUB_MODELS'] = '1'
+    if args.no_single_flight:
+        os.environ['AI_SINGLE_FLIGHT'] = '0'
+    if args.stub_latency_ms is not None:
+        os.environ['AI_STUB_LATENCY_MS'] = args.stub_latency_ms
+    if args.torch_threads:
+        os.environ['OMP_NUM_THREADS'] = str(args.torch_threads)
+        os.environ['MKL_NUM_THREADS'] = str(args.torch_threads)
+    if args.tf_threads:
+        os.environ['TF_NUM_INTRAOP_THREADS'] = str(args.tf_threads)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import orchestrator
+    if not orchestrator.initialize_orchestrator():
+        print('Failed to initialize the orchestrator')
+        sys.exit(1)
+
+    images = read_samples(args.images)
+    audio = read_samples(args.audio)
+    requests_by_kind = {}
+    for kind, weight in args.mix.items():
+        if weight <= 0:
+            continue
+        requests = build_requests(kind, images, audio, unique=not args.repeat_payloads)
+        if not requests:
+            print(f'No samples available for {kind} requests, dropping it from the mix')
+            continue
+        requests_by_kind[kind] = requests
+    mix = {kind: args.mix[kind] for kind in requests_by_kind}
+    if not mix:
+        print('Nothing to send')
+        sys.exit(1)
+
+    client = InProcessClient(orchestrator.app) if args.mode == 'inprocess' else HTTPClient(orchestrator.app)
+    rng = random.Random(args.seed)
+    sequence = itertools.count()
+    single_flight = orchestrator.orchestrator.single_flight
+    steps = []
+    saturation = None
+    try:
+        for kind, requests in requests_by_kind.items():
+            for request in requests[:args.warmup]:
+                client.send(*request)
+
+        for rate in args.rates:
+            before = single_flight.stats()
+            step = run_step(client, requests_by_kind, mix, rate, args.duration, args.concurrency, rng, sequence)
+            step['single_flight'] = single_flight_delta(before, single_flight.stats())
+            steps.append(step)
+            print(f"{rate:>8.1f} rps offered  {step['achieved_rps']:>8.2f} achieved  "
+                  f"p50 {step['latency']['p50_ms'] or 0:>8.1f} ms  p99 {step['latency']['p99_ms'] or 0:>8.1f} ms  "
+                  f"errors {step['error_rate']:.2%}")
+            if saturation is None and is_saturated(step, args.slo_ms, args.max_error_rate):
+                saturation = rate
+    finally:
+        client.close()
+
+    report = {
+        'config': {
+            'mode': args.mode,
+            'split_workers': bool(os.environ.get('AI_SPLIT_WORKERS')),
+            'stub_models': bool(os.environ.get('AI_STUB_MODELS')),
+            'stub_latency_ms': os.environ.get('AI_STUB_LATENCY_MS'),
+            'single_flight': single_flight.enabled,
+            'unique_payloads': not args.repeat_payloads,
+            'torch_threads': args.torch_threads,
+            'tf_threads': args.tf_threads,
+            'concurrency': args.concurrency,
+            'mix': mix,
+            'duration_seconds': args.duration,
+            'slo_ms': args.slo_ms,
+            'model_versions': orchestrator.orchestrator.model_versions()
+        },
+        'steps': steps,
+        'saturation_rps': saturation,
+        'max_sustained_rps': max((s['achieved_rps'] for s in steps if not is_saturated(s, args.slo_ms, args.max_error_rate)), default=None)
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
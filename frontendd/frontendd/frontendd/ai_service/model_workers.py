@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import time
+import queue
+import atexit
+import shutil
+import logging
+import secrets
+import argparse
+import tempfile
+import threading
+import subprocess
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Client, Listener
+
+# split deployment (AI_SPLIT_WORKERS): the orchestrator process only parses requests and decodes uploads,
+# while one worker process per framework owns the models. Decoded images and audio cross over in shared
+# memory; only small control messages go through the sockets. Nothing here imports an ML framework.
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from model_runtime.loading import load_model_class
+
+MODEL_FRAMEWORKS = {'text': 'torch', 'image': 'torch', 'audio': 'tensorflow'}
+STUB_CLASSES = {'text': 'StubTextClassifier', 'audio': 'StubAudioClassifier', 'image': 'StubImagePredictor'}
+
+WORKER_CHANNELS = int(os.environ.get('AI_WORKER_CHANNELS', '4'))
+WORKER_START_TIMEOUT = float(os.environ.get('AI_WORKER_START_TIMEOUT', '30'))
+# versions kept loaded per model in a worker, so in-flight requests survive a hot swap
+WORKER_KEEP_VERSIONS = 2
+
+logger = logging.getLogger(__name__)
+
+class SharedArray:
+    # an array (or raw bytes) copied once into a shared memory segment; only its name and shape are pickled
+    def __init__(self, data, view: str = 'array'):
+        import numpy as np
+        array = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else np.ascontiguousarray(data)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        target = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)
+        target[...] = array
+        del target
+        self.spec = {'__shared__': self.shm.name, 'shape': array.shape, 'dtype': array.dtype.str,
+                     'nbytes': array.nbytes, 'view': view}
+
+    def release(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+def _attach(spec):
+    # the front process owns and unlinks every segment, so the worker must not track them itself
+    try:
+        shm = shared_memory.SharedMemory(name=spec['__shared__'], track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=spec['__shared__'])
+        resource_tracker.unregister(shm._name, 'shared_memory')
+
+    if spec['view'] == 'bytes':
+        value = bytes(shm.buf[:spec['nbytes']])
+    elif spec['view'] == 'stream':
+        value = io.BytesIO(shm.buf[:spec['nbytes']])
+    else:
+        import numpy as np
+        value = np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+    return shm, value
+
+def _to_specs(value, shared: list):
+    if isinstance(value, list):
+        return [_to_specs(item, shared) for item in value]
+    if isinstance(value, SharedArray):
+        shared.append(value)
+        return value.spec
+    return value
+
+def _from_specs(value, attached: list):
+    if isinstance(value, list):
+        return [_from_specs(item, attached) for item in value]
+    if isinstance(value, dict) and '__shared__' in value:
+        shm, value = _attach(value)
+        attached.append(shm)
+    return value
+
+def _detach(shm) -> None:
+    try:
+        shm.close()
+    except BufferError:
+        # a model kept a view of the buffer; the mapping is released when that goes away
+        pass
+
+def decode_image(image_bytes: bytes):
+    import numpy as np
+    from PIL import Image
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return np.asarray(image.convert('RGB'))
+
+def decode_audio(source, sample_rate: int, duration: float, res_type: str):
+    # the same decode DogAudioClassifier._load_audio runs, for what soundfile can read; None leaves decoding to the worker
+    if not res_type.startswith('soxr'):
+        return None
+    import numpy as np
+    from model_runtime.audio_io import decode_window, resample
+
+    decoded = decode_window(source, duration)
+    if decoded is None:
+        return None
+    audio, native_sr = decoded
+    return np.ascontiguousarray(resample(audio, native_sr, sample_rate, res_type), dtype=np.float32)
+
+class WorkerClient:
+    # one framework's worker process, reached over up to `channels` authenticated unix socket connections
+    def __init__(self, framework: str, channels: int = WORKER_CHANNELS):
+        self.framework = framework
+        self.channels = channels
+        self.authkey = secrets.token_bytes(32)
+        self.socket_dir = tempfile.mkdtemp(prefix=f'ai-{framework}-worker-')
+        self.address = os.path.join(self.socket_dir, 'socket')
+        self.process = None
+        self.restarts = 0
+        self.requests = 0
+        self._open = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                return
+            if self.process is not None:
+                self.restarts += 1
+                logger.warning(f"{self.framework} worker exited with code {self.process.returncode}, restarting")
+                self._discard_channels()
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+
+            env = dict(os.environ, AI_WORKER_AUTHKEY=self.authkey.hex())
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--framework', self.framework, '--address', self.address],
+                env=env
+            )
+
+    def stop(self) -> None:
+        with self._lock:
+            self._discard_channels()
+            if self.process is not None and self.process.poll() is None:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def call(self, op: str, **payload):
+        # arguments may be SharedArrays or lists of them (a batch); each is sent as its segment spec
+        shared = []
+        try:
+            if 'args' in payload:
+                payload['args'] = tuple(_to_specs(value, shared) for value in payload['args'])
+            connection = self._checkout()
+            try:
+                connection.send((op, payload))
+                ok, value = connection.recv()
+            except (EOFError, OSError) as e:
+                connection.close()
+                with self._lock:
+                    self._open = max(self._open - 1, 0)
+                raise RuntimeError(f"{self.framework} worker connection lost: {str(e)}")
+            self._idle.put(connection)
+        finally:
+            for segment in shared:
+                segment.release()
+
+        self.requests += 1
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def stats(self) -> dict:
+        alive = self.process is not None and self.process.poll() is None
+        return {
+            'pid': self.process.pid if alive else None,
+            'alive': alive,
+            'channels_open': self._open,
+            'channels_max': self.channels,
+            'requests': self.requests,
+            'restarts': self.restarts
+        }
+
+    def _checkout(self):
+        self.start()
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                create = self._open < self.channels
+                if create:
+                    self._open += 1
+            if create:
+                break
+            # rechecking now and then, since a lost connection frees its slot without coming back to the queue
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._open = max(self._open - 1, 0)
+            raise
+
+    def _connect(self):
+        # the worker binds its socket before importing anything heavy, so this only waits for interpreter start
+        deadline = time.time() + WORKER_START_TIMEOUT
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.framework} worker exited with code {self.process.returncode}")
+            try:
+                return Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.time() > deadline:
+                    raise TimeoutError(f"{self.framework} worker did not start within {WORKER_START_TIMEOUT:g}s")
+                time.sleep(0.05)
+
+    def _discard_channels(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._open = 0
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+def worker_for(framework: str) -> WorkerClient:
+    with _workers_lock:
+        if framework not in _workers:
+            _workers[framework] = WorkerClient(framework)
+            atexit.register(_workers[framework].stop)
+        return _workers[framework]
+
+def worker_stats() -> dict:
+    return {framework: worker.stats() for framework, worker in _workers.items()}
+
+class RemoteModel:
+    # front-process stand-in for a model living in a worker; constructing it blocks until the worker has it loaded
+    kind = None
+
+    def __init__(self, model_assets_path: str):
+        self.model_assets_path = os.path.abspath(model_assets_path)
+        self.worker = worker_for(MODEL_FRAMEWORKS[self.kind])
+        loaded = self.worker.call('load', kind=self.kind, path=self.model_assets_path)
+        self.methods = set(loaded['methods'])
+
+    def _call(self, method: str, *args):
+        return self.worker.call('call', kind=self.kind, path=self.model_assets_path, method=method, args=args)
+
+class RemoteTextClassifier(RemoteModel):
+    kind = 'text'
+
+    def predict(self, symptom_text, breed=None, age=None, sex=None, top_k=3):
+        return self._call('predict', symptom_text, breed, age, sex, top_k)
+
+    def assess_severity(self, symptom_text, breed=None, age=None, sex=None):
+        return self._call('assess_severity', symptom_text, breed, age, sex)
+
+    def tokenization_stats(self):
+        if 'tokenization_stats' not in self.methods:
+            return None
+        return self._call('tokenization_stats')
+
+class RemoteAudioClassifier(RemoteModel):
+    kind = 'audio'
+
+    def __init__(self, model_assets_path: str):
+        super().__init__(model_assets_path)
+        import json
+        from model_runtime.audio_io import resample_type
+        with open(os.path.join(self.model_assets_path, 'model_config.json'), 'r') as f:
+            config = json.load(f)
+        self.sample_rate = config.get('sample_rate', 16000)
+        self.duration = config.get('duration', 5)
+        self.res_type = resample_type(config.get('resample_quality', 'high'))
+
+    def predict(self, audio_path, top_k=3):
+        return self.predict_batch([audio_path], top_k)[0]
+
+    def predict_batch(self, audio_paths, top_k=3):
+        return self._call('predict_batch', [self._share(audio_path) for audio_path in audio_paths], top_k)
+
+    def _share(self, audio_path):
+        position = audio_path.tell() if hasattr(audio_path, 'read') else None
+        try:
+            audio = decode_audio(audio_path, self.sample_rate, self.duration, self.res_type)
+        except Exception:
+            audio = None
+            if position is not None:
+                audio_path.seek(position)
+        if audio is not None:
+            return SharedArray(audio)
+
+        # formats soundfile can't read (mp3, m4a) go over as the encoded file for the worker's librosa fallback
+        if hasattr(audio_path, 'read'):
+            data = audio_path.read()
+        else:
+            with open(audio_path, 'rb') as f:
+                data = f.read()
+        return SharedArray(data, view='stream')
+
+class RemoteImagePredictor(RemoteModel):
+    kind = 'image'
+
+    def predict_with_treatment(self, image_bytes, symptoms_text=None):
+        return self.predict_batch_with_treatment([image_bytes], symptoms_text)[0]
+
+    def predict_batch_with_treatment(self, images, symptoms_text=None):
+        return self._call('predict_batch_with_treatment', [self._share(image_bytes) for image_bytes in images], symptoms_text)
+
+    @staticmethod
+    def _share(image_bytes):
+        try:
+            return SharedArray(decode_image(image_bytes))
+        except Exception:
+            # undecodable uploads go over as-is and get the model's own error report
+            return SharedArray(image_bytes, view='bytes')
+
+    def assess_emergency_symptoms(self, symptoms_text):
+        return self._call('assess_emergency_symptoms', symptoms_text)
+
+REMOTE_CLASSES = {'text': RemoteTextClassifier, 'audio': RemoteAudioClassifier, 'image': RemoteImagePredictor}
+
+class ModelHost:
+    # worker side: models keyed by (kind, assets path), loaded on first use so a restarted worker recovers by itself
+    def __init__(self, framework: str):
+        self.framework = framework
+        self.models = {}
+        self._load_lock = threading.Lock()
+
+    def model(self, kind: str, path: str):
+        if MODEL_FRAMEWORKS.get(kind) != self.framework:
+            raise ValueError(f"{kind} model is not served by the {self.framework} worker")
+        model = self.models.get((kind, path))
+        if model is None:
+            with self._load_lock:
+                model = self.models.get((kind, path))
+                if model is None:
+                    model = self._load(kind, path)
+        return model
+
+    def _load(self, kind: str, path: str):
+        start = time.time()
+        model = self._model_class(kind)(path)
+        logger.info(f"Loaded {kind} model from {path} in {time.time() - start:.1f}s")
+
+        self.models[(kind, path)] = model
+        same_kind = [key for key in self.models if key[0] == kind]
+        for key in same_kind[:-WORKER_KEEP_VERSIONS]:
+            del self.models[key]
+        return model
+
+    @staticmethod
+    def _model_class(kind: str):
+        if os.environ.get('AI_STUB_MODELS'):
+            import stub_models
+            return getattr(stub_models, STUB_CLASSES[kind])
+        return load_model_class(kind)
+
+    def handle(self, op: str, payload: dict):
+        model = self.model(payload['kind'], payload['path'])
+        if op == 'load':
+            return {'methods': [name for name in dir(model) if not name.startswith('_') and callable(getattr(model, name))]}
+        if op != 'call':
+            raise ValueError(f"Unknown operation: {op}")
+
+        attached = []
+        args = [_from_specs(value, attached) for value in payload.get('args', ())]
+        try:
+            return getattr(model, payload['method'])(*args)
+        finally:
+            # array views into the segments have to be gone before they can be unmapped
+            args.clear()
+            for shm in attached:
+                _detach(shm)
+
+    def serve_connection(self, connection) -> None:
+        with connection:
+            while True:
+                try:
+                    op, payload = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = (True, self.handle(op, payload))
+                except Exception as e:
+                    logger.error(f"{self.framework} worker {op} failed: {str(e)}")
+                    response = (False, str(e))
+                connection.send(response)
+
+def _exit_with_parent(parent_pid: int) -> None:
+    while True:
+        time.sleep(1)
+        if os.getppid() != parent_pid:
+            os._exit(0)
+
+def serve(framework: str, address: str) -> None:
+    listener = Listener(address, family='AF_UNIX', authkey=bytes.fromhex(os.environ['AI_WORKER_AUTHKEY']))
+    threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True, name='parent-watch').start()
+    host = ModelHost(framework)
+    logger.info(f"{framework} worker listening on {address}")
+
+    while True:
+        try:
+            connection = listener.accept()
+        except Exception as e:
+            logger.warning(f"Rejected worker connection: {str(e)}")
+            continue
+        threading.Thread(target=host.serve_connection, args=(connection,), daemon=True,
+                         name=f'{framework}-channel').start()
+
+def main():
+    parser = argparse.ArgumentParser(description='Model worker process for the split orchestrator deployment')
+    parser.add_argument('--framework', choices=sorted(set(MODEL_FRAMEWORKS.values())), required=True)
+    parser.add_argument('--address', required=True, help='unix socket path to listen on')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.framework, args.address)
+
+if __name__ == "__main__":
+    main()
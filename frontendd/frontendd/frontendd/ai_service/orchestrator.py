@@ -1,90 +1,936 @@
+import io
 import os
+import re
+import gc
 import sys
 import json
+import copy
+import time
+import hmac
+import shutil
+import hashlib
+import zlib
+import uuid
 import tempfile
-import importlib.util
+import threading
 import logging
+from datetime import datetime
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Any
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
+from analysis_history import AnalysisHistory
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 text_model_path = os.path.join(os.path.dirname(__file__), '..', 'textmodelW', 'model_assets')
 audio_model_path = os.path.join(os.path.dirname(__file__), '..', 'audiomodelW', 'audio_model_assets')
 image_model_path = os.path.join(os.path.dirname(__file__), '..', 'imagemodelW', 'model_assets')
 
 sys.path.extend([text_model_path, audio_model_path, image_model_path])
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')))
+from model_runtime.loading import load_model_class
+from model_runtime.keyword_triage import KeywordTriage
 
-sys.path.insert(0, text_model_path)
-text_spec = importlib.util.spec_from_file_location("text_inference", os.path.join(text_model_path, "inference.py"))
-text_module = importlib.util.module_from_spec(text_spec)
-text_spec.loader.exec_module(text_module)
-DogDiseaseClassifier = text_module.DogDiseaseClassifier
-sys.path.pop(0)
-
-sys.path.insert(0, audio_model_path)
-audio_spec = importlib.util.spec_from_file_location("audio_inference", os.path.join(audio_model_path, "inference.py"))
-audio_module = importlib.util.module_from_spec(audio_spec)
-audio_spec.loader.exec_module(audio_module)
-DogAudioClassifier = audio_module.DogAudioClassifier
-sys.path.pop(0)
-
-sys.path.insert(0, image_model_path)
-image_spec = importlib.util.spec_from_file_location("image_inference", os.path.join(image_model_path, "inference.py"))
-image_module = importlib.util.module_from_spec(image_spec)
-image_spec.loader.exec_module(image_module)
-SkinDiseasePredictor = image_module.SkinDiseasePredictor
-sys.path.pop(0)
+def load_model_classes() -> Dict[str, Any]:
+    # AI_SPLIT_WORKERS serves the models from per-framework worker processes (see model_workers.py)
+    if os.environ.get('AI_SPLIT_WORKERS'):
+        import model_workers
+        return dict(model_workers.REMOTE_CLASSES)
+    
+    # AI_STUB_MODELS swaps in framework-free stand-ins, e.g. for measuring pure serving overhead
+    if os.environ.get('AI_STUB_MODELS'):
+        import stub_models
+        return {
+            'text': stub_models.StubTextClassifier,
+            'audio': stub_models.StubAudioClassifier,
+            'image': stub_models.StubImagePredictor
+        }
+    
+    return {
+        'text': load_model_class('text', text_model_path),
+        'audio': load_model_class('audio', audio_model_path),
+        'image': load_model_class('image', image_model_path)
+    }
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('AI_MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
 CORS(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+JOB_WORKERS = int(os.environ.get('AI_JOB_WORKERS', '2'))
+JOB_STORE_MAX = int(os.environ.get('AI_JOB_STORE_MAX', '1000'))
+# jobs waiting for or running on the job executor; submissions beyond this are rejected
+JOB_QUEUE_MAX = int(os.environ.get('AI_JOB_QUEUE_MAX', '100'))
+JOB_TTL_SECONDS = int(os.environ.get('AI_JOB_TTL_SECONDS', '3600'))
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get('AI_MODEL_MEMORY_BUDGET_MB', '0'))
+MODEL_IDLE_SECONDS = float(os.environ.get('AI_MODEL_IDLE_SECONDS', '0'))
+MODEL_WATCH_SECONDS = float(os.environ.get('AI_MODEL_WATCH_SECONDS', '0'))
+# the /debug/profile endpoints are only served when a token is configured
+PROFILE_TOKEN = os.environ.get('AI_PROFILE_TOKEN', '')
+# POST /models/<name>/reload switches the live model version, so it is only served when a token is configured
+ADMIN_TOKEN = os.environ.get('AI_ADMIN_TOKEN', '')
+PROFILE_MAX_SECONDS = float(os.environ.get('AI_PROFILE_MAX_SECONDS', '60'))
+PROFILE_DIR = os.environ.get('AI_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'pawlytics-profiles'))
+PROFILE_KEEP = int(os.environ.get('AI_PROFILE_KEEP', '5'))
+STREAM_WORKERS = int(os.environ.get('AI_STREAM_WORKERS', '8'))
+# AI_SINGLE_FLIGHT=0 runs every request on its own, e.g. to load-test serving rather than deduplication
+SINGLE_FLIGHT = os.environ.get('AI_SINGLE_FLIGHT', '1') != '0'
+IMAGE_CACHE_DISTANCE = int(os.environ.get('AI_IMAGE_CACHE_DISTANCE', '6'))
+IMAGE_CACHE_PER_DOG = int(os.environ.get('AI_IMAGE_CACHE_PER_DOG', '32'))
+IMAGE_CACHE_DOGS = int(os.environ.get('AI_IMAGE_CACHE_DOGS', '1000'))
+IMAGE_CACHE_TTL_SECONDS = float(os.environ.get('AI_IMAGE_CACHE_TTL_SECONDS', '3600'))
+
+def _current_rss() -> int:
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+class JobStore:
+    # bounded in-memory store for async job results, finished jobs expire after ttl_seconds;
+    # unfinished jobs are never evicted, so create() returns None when they fill the store
+    def __init__(self, max_jobs: int = JOB_STORE_MAX, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def create(self) -> Optional[str]:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._evict(now, make_room=True)
+            if len(self._jobs) >= self.max_jobs:
+                return None
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'created_at': now,
+                'updated_at': now,
+                'result': None,
+                'error': None
+            }
+        return job_id
+    
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job['updated_at'] = time.time()
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._evict(time.time())
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {'size': len(self._jobs), 'max_jobs': self.max_jobs, 'by_status': counts}
+    
+    def _evict(self, now: float, make_room: bool = False) -> None:
+        # drop expired finished jobs, then, when making room for a new job, the oldest finished ones
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in ('completed', 'failed')]
+        for job_id in finished:
+            if now - self._jobs[job_id]['updated_at'] > self.ttl_seconds:
+                del self._jobs[job_id]
+        
+        finished = [job_id for job_id in finished if job_id in self._jobs]
+        while make_room and len(self._jobs) >= self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+
+class SingleFlight:
+    # collapses concurrent calls sharing a key into one computation whose result every caller receives
+    def __init__(self, enabled: bool = SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+    
+    def do(self, kind: str, key: str, fn):
+        with self._lock:
+            stats = self._stats.setdefault(kind, {'executed': 0, 'collapsed': 0})
+            call = self._calls.get(key) if self.enabled else None
+            if not self.enabled:
+                stats['executed'] += 1
+                leader = None
+            elif call is None:
+                call = {'event': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+                stats['executed'] += 1
+                leader = True
+            else:
+                stats['collapsed'] += 1
+                leader = False
+        
+        if leader is None:
+            return fn()
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return copy.deepcopy(call['result'])
+        
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['event'].set()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'in_flight': len(self._calls),
+                'by_type': copy.deepcopy(self._stats)
+            }
+
+class NearDuplicateImageCache:
+    # per-dog index of recent image results keyed by a 64-bit difference hash, so a re-photographed lesion
+    # (reframed, recompressed) within `max_distance` differing bits reuses the earlier result;
+    # a negative distance disables it
+    def __init__(self, max_distance: int = IMAGE_CACHE_DISTANCE, per_dog: int = IMAGE_CACHE_PER_DOG,
+                 max_dogs: int = IMAGE_CACHE_DOGS, ttl_seconds: float = IMAGE_CACHE_TTL_SECONDS):
+        self.max_distance = max_distance
+        self.per_dog = per_dog
+        self.max_dogs = max_dogs
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._dogs = OrderedDict()
+        self._stats = {'lookups': 0, 'hits': 0, 'unhashable': 0, 'hash_seconds': 0.0, 'lookup_seconds': 0.0}
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance >= 0 and self.per_dog > 0
+    
+    @staticmethod
+    def image_hash(image_bytes: bytes) -> Optional[int]:
+        from PIL import Image
+        
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                # JPEGs are decoded straight at a fraction of their size; the hash only needs 9x8 pixels
+                image.draft('L', (64, 64))
+                pixels = list(image.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+        except Exception:
+            return None
+        
+        value = 0
+        for row in range(8):
+            for col in range(8):
+                value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+        return value
+    
+    def lookup(self, dog_id: str, image_bytes: bytes, context: tuple):
+        # returns (hash, cached result or None); `context` (symptoms, model version) must match exactly
+        started = time.perf_counter()
+        image_hash = self.image_hash(image_bytes)
+        hashed = time.perf_counter()
+        
+        result = None
+        with self._lock:
+            self._stats['lookups'] += 1
+            self._stats['hash_seconds'] += hashed - started
+            if image_hash is None:
+                self._stats['unhashable'] += 1
+            else:
+                entries = self._dogs.get(dog_id)
+                if entries:
+                    self._dogs.move_to_end(dog_id)
+                    cutoff = time.time() - self.ttl_seconds
+                    while entries and entries[0]['stored_at'] < cutoff:
+                        entries.pop(0)
+                    # newest first, so the latest photo of the lesion wins
+                    for entry in reversed(entries):
+                        if entry['context'] == context and bin(entry['hash'] ^ image_hash).count('1') <= self.max_distance:
+                            result = copy.deepcopy(entry['result'])
+                            self._stats['hits'] += 1
+                            break
+            self._stats['lookup_seconds'] += time.perf_counter() - hashed
+        return image_hash, result
+    
+    def store(self, dog_id: str, image_hash: Optional[int], context: tuple, result: Dict) -> None:
+        if image_hash is None:
+            return
+        with self._lock:
+            entries = self._dogs.setdefault(dog_id, [])
+            self._dogs.move_to_end(dog_id)
+            entries.append({'hash': image_hash, 'context': context, 'result': copy.deepcopy(result), 'stored_at': time.time()})
+            del entries[:-self.per_dog]
+            while len(self._dogs) > self.max_dogs:
+                self._dogs.popitem(last=False)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats['lookups']
+            return {
+                'enabled': self.enabled,
+                'max_distance': self.max_distance,
+                'dogs': len(self._dogs),
+                'entries': sum(len(entries) for entries in self._dogs.values()),
+                'lookups': lookups,
+                'hits': self._stats['hits'],
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'unhashable': self._stats['unhashable'],
+                'avg_hash_ms': 1000 * self._stats['hash_seconds'] / lookups if lookups else 0.0,
+                'avg_lookup_ms': 1000 * self._stats['lookup_seconds'] / lookups if lookups else 0.0
+            }
+
+class ModelResidencyManager:
+    # keeps models within a memory budget, loading on demand and evicting the least recently used idle model
+    def __init__(self, budget_mb: float = MODEL_MEMORY_BUDGET_MB, idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._entries = OrderedDict()
+        if idle_seconds > 0:
+            # requests only check the budget when they arrive, so a quiet service needs its own idle sweep
+            threading.Thread(target=self._reap_idle, daemon=True, name='model-reaper').start()
+    
+    def _reap_idle(self) -> None:
+        interval = max(0.1, min(self.idle_seconds / 2, 30))
+        while True:
+            time.sleep(interval)
+            try:
+                self._enforce_budget()
+            except Exception as e:
+                logger.error(f"Idle model eviction error: {str(e)}")
+    
+    def register(self, name: str, loader, version: str = None) -> None:
+        self._entries[name] = {
+            'loader': loader,
+            'version': version,
+            'swaps': 0,
+            'model': None,
+            'footprint': 0,
+            'loads': 0,
+            'evictions': 0,
+            'in_use': 0,
+            'last_used': None,
+            'last_load_seconds': None
+        }
+    
+    def keys(self) -> List[str]:
+        return list(self._entries.keys())
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+    
+    def __getitem__(self, name: str):
+        with self.use(name) as model:
+            return model
+    
+    def load(self, name: str) -> None:
+        with self.use(name):
+            pass
+    
+    def resident_model(self, name: str):
+        # returns the model only if it is loaded, without triggering a load or touching LRU order
+        with self._lock:
+            return self._entries[name]['model']
+    
+    def version(self, name: str) -> Optional[str]:
+        return self._entries[name]['version']
+    
+    def swap(self, name: str, loader, version: str) -> None:
+        # builds the new model off to the side, then replaces the entry in one step;
+        # in-flight requests keep their reference to the old model and drain on it
+        entry = self._entries[name]
+        with self._load_lock:
+            rss_before = _current_rss()
+            start = time.time()
+            model = loader()
+            load_seconds = time.time() - start
+            footprint = max(_current_rss() - rss_before, 0)
+        
+        with self._lock:
+            entry['loader'] = loader
+            entry['version'] = version
+            entry['model'] = model
+            entry['footprint'] = footprint
+            entry['last_load_seconds'] = load_seconds
+            entry['loads'] += 1
+            entry['swaps'] += 1
+            self._entries.move_to_end(name)
+        
+        logger.info(f"Swapped {name} model to version {version}")
+        self._enforce_budget(exclude=name)
+    
+    @contextmanager
+    def use(self, name: str):
+        entry = self._acquire(name)
+        try:
+            yield entry['model']
+        finally:
+            with self._lock:
+                entry['in_use'] -= 1
+                entry['last_used'] = time.time()
+    
+    def _acquire(self, name: str) -> Dict:
+        entry = self._entries[name]
+        with self._lock:
+            if entry['model'] is not None:
+                entry['in_use'] += 1
+                self._entries.move_to_end(name)
+                acquired = True
+            else:
+                acquired = False
+        
+        if not acquired:
+            # loads are serialized so the resident-set delta is attributable to one model
+            with self._load_lock:
+                if entry['model'] is None:
+                    rss_before = _current_rss()
+                    start = time.time()
+                    model = entry['loader']()
+                    entry['last_load_seconds'] = time.time() - start
+                    entry['footprint'] = max(_current_rss() - rss_before, 0)
+                    entry['loads'] += 1
+                    logger.info(f"Loaded {name} model ({entry['footprint'] / 1024 / 1024:.0f} MB in {entry['last_load_seconds']:.1f}s)")
+                else:
+                    model = entry['model']
+                with self._lock:
+                    entry['model'] = model
+                    entry['in_use'] += 1
+                    self._entries.move_to_end(name)
+        
+        self._enforce_budget(exclude=name)
+        return entry
+    
+    def _enforce_budget(self, exclude: str = None) -> None:
+        if self.budget_bytes <= 0 and self.idle_seconds <= 0:
+            return
+        
+        with self._lock:
+            now = time.time()
+            evictable = [
+                name for name, entry in self._entries.items()
+                if entry['model'] is not None and entry['in_use'] == 0 and name != exclude
+            ]
+            
+            victims = []
+            if self.idle_seconds > 0:
+                victims = [
+                    name for name in evictable
+                    if self._entries[name]['last_used'] and now - self._entries[name]['last_used'] > self.idle_seconds
+                ]
+            
+            if self.budget_bytes > 0:
+                resident = sum(
+                    entry['footprint'] for name, entry in self._entries.items()
+                    if entry['model'] is not None and name not in victims
+                )
+                # entries are kept in least recently used order
+                for name in evictable:
+                    if resident <= self.budget_bytes:
+                        break
+                    if name not in victims:
+                        victims.append(name)
+                        resident -= self._entries[name]['footprint']
+            
+            for name in victims:
+                self._entries[name]['model'] = None
+                self._entries[name]['evictions'] += 1
+        
+        if victims:
+            logger.info(f"Evicted models: {', '.join(victims)}")
+            gc.collect()
+            torch_module = sys.modules.get('torch')
+            if torch_module is not None and torch_module.cuda.is_available():
+                torch_module.cuda.empty_cache()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            models = {}
+            resident = 0
+            for name, entry in self._entries.items():
+                if entry['model'] is not None:
+                    resident += entry['footprint']
+                models[name] = {
+                    'version': entry['version'],
+                    'swaps': entry['swaps'],
+                    'resident': entry['model'] is not None,
+                    'footprint_mb': round(entry['footprint'] / 1024 / 1024, 1),
+                    'loads': entry['loads'],
+                    'evictions': entry['evictions'],
+                    'in_use': entry['in_use'],
+                    'last_used': entry['last_used'],
+                    'last_load_seconds': entry['last_load_seconds']
+                }
+            return {
+                'budget_mb': round(self.budget_bytes / 1024 / 1024, 1) if self.budget_bytes > 0 else None,
+                'idle_seconds': self.idle_seconds or None,
+                'resident_mb': round(resident / 1024 / 1024, 1),
+                'process_rss_mb': round(_current_rss() / 1024 / 1024, 1),
+                'models': models
+            }
+
+class ModelRegistry:
+    # new versions are deployed as complete asset directories under <assets>/versions/<version>/;
+    # the base assets directory itself is the baseline version and versions/ACTIVE records the live one
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.versions_path = os.path.join(base_path, 'versions')
+        self.active_file = os.path.join(self.versions_path, 'ACTIVE')
+    
+    @property
+    def baseline_version(self) -> str:
+        try:
+            with open(os.path.join(self.base_path, 'model_config.json'), 'r') as f:
+                return json.load(f).get('version', 'v1.0')
+        except (OSError, ValueError):
+            return 'v1.0'
+    
+    @staticmethod
+    def _sort_key(version: str):
+        return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', version)]
+    
+    def versions(self) -> Dict[str, str]:
+        versions = {self.baseline_version: self.base_path}
+        if os.path.isdir(self.versions_path):
+            for version in sorted(os.listdir(self.versions_path), key=self._sort_key):
+                path = os.path.join(self.versions_path, version)
+                if os.path.isfile(os.path.join(path, 'model_config.json')):
+                    versions[version] = path
+        return versions
+    
+    def active_version(self) -> Optional[str]:
+        try:
+            with open(self.active_file, 'r') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    def latest_version(self) -> str:
+        return list(self.versions().keys())[-1]
+    
+    def resolve(self, version: str = None):
+        versions = self.versions()
+        version = version or self.active_version() or self.baseline_version
+        if version not in versions:
+            raise ValueError(f"Unknown model version: {version}")
+        return version, versions[version]
+    
+    def activate(self, version: str) -> None:
+        os.makedirs(self.versions_path, exist_ok=True)
+        tmp_file = self.active_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(version)
+        os.replace(tmp_file, self.active_file)
+
+class Profiler:
+    # on-demand profiling of live traffic; while no session is running trace() hands back a shared no-op context
+    MODEL_FRAMEWORKS = {'text': 'torch', 'image': 'torch', 'audio': 'tensorflow'}
+    IDLE_FRAMES = {('threading.py', 'wait'), ('selectors.py', 'select'), ('socket.py', 'accept'),
+                   ('socketserver.py', 'serve_forever'), ('thread.py', '_worker'), ('queue.py', 'get')}
+    
+    def __init__(self, output_dir: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.output_dir = output_dir
+        self.keep = keep
+        self.session = None
+        self._idle = nullcontext()
+        self._lock = threading.Lock()
+        self._torch_lock = threading.Lock()
+    
+    @property
+    def active(self) -> bool:
+        return self.session is not None
+    
+    def trace(self, kind: str):
+        session = self.session
+        if session is None or not session['torch_ops'] or self.MODEL_FRAMEWORKS.get(kind) != 'torch':
+            return self._idle
+        return self._torch_trace(session, kind)
+    
+    @contextmanager
+    def _torch_trace(self, session: Dict, kind: str):
+        # torch's profiler is per thread, so one request at a time is traced and the rest run untouched
+        torch = sys.modules.get('torch')
+        if torch is None or not self._torch_lock.acquire(blocking=False):
+            yield
+            return
+        try:
+            with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True) as prof:
+                with torch.profiler.record_function(f'analyze_{kind}'):
+                    yield
+            if self.session is session:
+                session['torch_traces'] += 1
+                prof.export_chrome_trace(os.path.join(session['path'], f"torch-{session['torch_traces']:04d}-{kind}.json"))
+        finally:
+            self._torch_lock.release()
+    
+    def record(self, session_id: str, seconds: float, interval_ms: float = 10, torch_ops: bool = True, tf_ops: bool = True) -> Dict:
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError('A profiling session is already running')
+            self._prune()
+            path = os.path.join(self.output_dir, session_id)
+            os.makedirs(path, exist_ok=True)
+            session = {'path': path, 'torch_ops': torch_ops, 'torch_traces': 0}
+            self.session = session
+        
+        tf = sys.modules.get('tensorflow') if tf_ops else None
+        tf_logdir = os.path.join(path, 'tf')
+        if tf is not None:
+            try:
+                tf.profiler.experimental.start(tf_logdir)
+            except Exception as e:
+                logger.warning(f"TensorFlow profiler unavailable: {str(e)}")
+                tf = None
+        
+        stacks = {}
+        sampling = {'samples': 0, 'idle': 0}
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(stop, interval_ms / 1000, stacks, sampling),
+                                   daemon=True, name='profile-sampler')
+        started = time.time()
+        sampler.start()
+        try:
+            stop.wait(seconds)
+        finally:
+            stop.set()
+            sampler.join()
+            if tf is not None:
+                tf.profiler.experimental.stop()
+            with self._lock:
+                self.session = None
+            # a request still inside a torch trace finishes exporting before the traces are merged
+            with self._torch_lock:
+                pass
+        
+        artifacts = []
+        with open(os.path.join(path, 'python.folded'), 'w') as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f'{stack} {count}\n')
+        artifacts.append('python.folded')
+        
+        with open(os.path.join(path, 'python_flamegraph.svg'), 'w') as f:
+            f.write(self._flamegraph_svg(stacks))
+        artifacts.append('python_flamegraph.svg')
+        
+        if session['torch_traces']:
+            self._merge_torch_traces(path)
+            artifacts.append('torch_trace.json')
+        
+        if tf is not None and os.path.isdir(tf_logdir):
+            shutil.make_archive(os.path.join(path, 'tf_trace'), 'zip', tf_logdir)
+            shutil.rmtree(tf_logdir, ignore_errors=True)
+            artifacts.append('tf_trace.zip')
+        
+        return {
+            'started_at': datetime.fromtimestamp(started).isoformat(),
+            'duration_seconds': round(time.time() - started, 2),
+            'interval_ms': interval_ms,
+            'python_samples': sampling['samples'],
+            'python_idle_samples': sampling['idle'],
+            'torch_traced_requests': session['torch_traces'],
+            'tf_traced': tf is not None,
+            'artifacts': artifacts
+        }
+    
+    def artifact_path(self, session_id: str, name: str) -> Optional[str]:
+        if os.sep in name or name.startswith('.') or not re.fullmatch(r'[0-9a-f]+', session_id):
+            return None
+        path = os.path.join(self.output_dir, session_id, name)
+        return path if os.path.isfile(path) else None
+    
+    def _sample(self, stop: threading.Event, interval: float, stacks: Dict, sampling: Dict) -> None:
+        # folded stacks (thread;outer;...;inner) of every other thread, the input format for flame graphs
+        own = threading.get_ident()
+        while not stop.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in self.IDLE_FRAMES:
+                    sampling['idle'] += 1
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                stack = ';'.join(reversed(frames))
+                stacks[stack] = stacks.get(stack, 0) + 1
+                sampling['samples'] += 1
+    
+    @staticmethod
+    def _flamegraph_svg(stacks: Dict, width: int = 1200, row: int = 16) -> str:
+        tree = {'children': {}, 'count': 0}
+        for stack, count in stacks.items():
+            node = tree
+            node['count'] += count
+            for name in stack.split(';'):
+                node = node['children'].setdefault(name, {'children': {}, 'count': 0})
+                node['count'] += count
+        
+        rects = []
+        depth_max = [0]
+        
+        def layout(node, x, depth):
+            for name, child in sorted(node['children'].items()):
+                w = child['count'] / tree['count'] * width
+                if w >= 0.5:
+                    rects.append((x, depth, w, name, child['count']))
+                    depth_max[0] = max(depth_max[0], depth)
+                    layout(child, x, depth + 1)
+                x += w
+        
+        if tree['count']:
+            layout(tree, 0.0, 0)
+        height = (depth_max[0] + 1) * row + 20
+        
+        def escape(text):
+            return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+        
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">']
+        for x, depth, w, name, count in rects:
+            y = height - (depth + 1) * row
+            hue = 20 + (zlib.crc32(name.encode('utf-8')) % 40)
+            label = escape(name)
+            pct = count / tree['count'] * 100
+            parts.append(f'<g><title>{label} ({count} samples, {pct:.1f}%)</title>'
+                         f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},90%,60%)"/>')
+            if w > 40:
+                parts.append(f'<text x="{x + 3:.1f}" y="{y + row - 5}">{escape(name[:int(w / 7)])}</text>')
+            parts.append('</g>')
+        parts.append('</svg>')
+        return '\n'.join(parts)
+    
+    @staticmethod
+    def _merge_torch_traces(path: str) -> None:
+        # one Chrome trace per traced request, merged with each request shown as its own process
+        events = []
+        names = sorted(name for name in os.listdir(path) if name.startswith('torch-') and name.endswith('.json'))
+        for pid, name in enumerate(names, 1):
+            with open(os.path.join(path, name), 'r') as f:
+                trace = json.load(f)
+            offset = trace.get('baseTimeNanoseconds', 0) / 1000
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name[:-5]}})
+            for event in trace.get('traceEvents', []):
+                event['pid'] = pid
+                if 'ts' in event and offset:
+                    event['ts'] = float(event['ts']) + offset
+                events.append(event)
+            os.unlink(os.path.join(path, name))
+        
+        with open(os.path.join(path, 'torch_trace.json'), 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    
+    def _prune(self) -> None:
+        if not os.path.isdir(self.output_dir):
+            return
+        sessions = sorted(
+            (os.path.join(self.output_dir, name) for name in os.listdir(self.output_dir)),
+            key=os.path.getmtime
+        )
+        for stale in sessions[:max(0, len(sessions) - self.keep + 1)]:
+            shutil.rmtree(stale, ignore_errors=True)
+
 class AIOrchestrator:
     def __init__(self):
-        self.models = {}
+        self.models = ModelResidencyManager()
+        self.registries = {}
+        self.model_classes = {}
+        self._reload_locks = {}
+        self._watched_versions = {}
+        self._model_paths = {}
+        self._keyword_triage = None
+        self._keyword_triage_lock = threading.Lock()
+        self.single_flight = SingleFlight()
+        self.image_cache = NearDuplicateImageCache()
+        self.history = AnalysisHistory()
+        self.profiler = Profiler()
+        self.stream_executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix='ai-stream')
         self.initialize_models()
     
+    @staticmethod
+    def _request_key(kind: str, *parts) -> str:
+        digest = hashlib.sha256(kind.encode('utf-8'))
+        for part in parts:
+            if isinstance(part, bytes):
+                digest.update(b'\x00b')
+                digest.update(part)
+            else:
+                digest.update(b'\x00s')
+                digest.update(repr(part).encode('utf-8'))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _file_digest(source) -> bytes:
+        # accepts a path or a seekable binary stream, which is rewound so the model can read it afterwards
+        digest = hashlib.sha256()
+        if hasattr(source, 'read'):
+            position = source.tell()
+            for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                digest.update(chunk)
+            source.seek(position)
+            return digest.digest()
+        
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.digest()
+    
     def initialize_models(self):
         try:
             base_dir = os.path.dirname(os.path.dirname(__file__))
+            model_classes = load_model_classes()
             
-            text_model_path = os.path.join(base_dir, 'textmodelW', 'model_assets')
-            if os.path.exists(text_model_path):
-                self.models['text'] = DogDiseaseClassifier(text_model_path)
-                logger.info("Text model loaded successfully")
-            else:
-                logger.error(f"Text model path not found: {text_model_path}")
-                raise FileNotFoundError(f"Text model assets not found at {text_model_path}")
+            model_specs = [
+                ('text', os.path.join(base_dir, 'textmodelW', 'model_assets'), model_classes['text'], 'Text'),
+                ('audio', os.path.join(base_dir, 'audiomodelW', 'audio_model_assets'), model_classes['audio'], 'Audio'),
+                ('image', os.path.join(base_dir, 'imagemodelW', 'model_assets'), model_classes['image'], 'Image')
+            ]
             
-            audio_model_path = os.path.join(base_dir, 'audiomodelW', 'audio_model_assets')
-            if os.path.exists(audio_model_path):
-                self.models['audio'] = DogAudioClassifier(audio_model_path)
-                logger.info("Audio model loaded successfully")
-            else:
-                logger.error(f"Audio model path not found: {audio_model_path}")
-                raise FileNotFoundError(f"Audio model assets not found at {audio_model_path}")
+            for name, model_path, model_class, label in model_specs:
+                if not os.path.exists(model_path):
+                    logger.error(f"{label} model path not found: {model_path}")
+                    raise FileNotFoundError(f"{label} model assets not found at {model_path}")
+                self.registries[name] = ModelRegistry(model_path)
+                self.model_classes[name] = model_class
+                self._reload_locks[name] = threading.Lock()
+                
+                version, version_path = self.registries[name].resolve()
+                # the watcher only reacts to versions deployed after startup, so a rollback recorded in ACTIVE
+                # survives a restart instead of being swapped straight back to the newest deployed version
+                self._watched_versions[name] = self.registries[name].latest_version()
+                self._model_paths[name] = version_path
+                self.models.register(name, self._version_loader(name, version, version_path), version)
             
-            image_model_path = os.path.join(base_dir, 'imagemodelW', 'model_assets')
-            if os.path.exists(image_model_path):
-                self.models['image'] = SkinDiseasePredictor(image_model_path)
-                logger.info("Image model loaded successfully")
+            # loading eagerly at startup; the budget then evicts as needed and evicted models reload on demand.
+            # With split workers the loading happens in the workers, so the front process serves right away
+            if os.environ.get('AI_SPLIT_WORKERS'):
+                threading.Thread(target=self._preload_models, args=(model_specs,), daemon=True, name='model-preload').start()
             else:
-                logger.error(f"Image model path not found: {image_model_path}")
-                raise FileNotFoundError(f"Image model assets not found at {image_model_path}")
+                self._preload_models(model_specs)
             
         except Exception as e:
             logger.error(f"Error initializing models: {str(e)}")
             raise
     
-    def analyze_text(self, symptom_text: str, breed: str = None, age: int = None, sex: str = None) -> Dict:
+    def _preload_models(self, model_specs: List) -> None:
+        for name, model_path, model_class, label in model_specs:
+            try:
+                self.models.load(name)
+                logger.info(f"{label} model loaded successfully")
+            except Exception as e:
+                logger.error(f"Error loading {label} model: {str(e)}")
+                if not os.environ.get('AI_SPLIT_WORKERS'):
+                    raise
+    
+    def _version_loader(self, name: str, version: str, path: str):
+        def load():
+            model = self.model_classes[name](path)
+            model.model_version = version
+            return model
+        return load
+    
+    def reload_model(self, name: str, version: str = None) -> Dict:
+        # loads and warms the requested (default: latest) version, then swaps it in without interrupting service
+        if name not in self.registries:
+            raise ValueError(f"Unknown model: {name}")
+        
+        with self._reload_locks[name]:
+            registry = self.registries[name]
+            version, path = registry.resolve(version or registry.latest_version())
+            previous = self.models.version(name)
+            if version == previous:
+                return {'model': name, 'version': version, 'status': 'unchanged'}
+            
+            self.models.swap(name, self._version_loader(name, version, path), version)
+            self._model_paths[name] = path
+            registry.activate(version)
+            return {'model': name, 'version': version, 'previous_version': previous, 'status': 'swapped'}
+    
+    def reload_latest_models(self) -> List[Dict]:
+        # only reacts to newly deployed versions, so an explicit rollback through reload_model is not undone
+        results = []
+        for name, registry in self.registries.items():
+            latest = registry.latest_version()
+            if latest != self._watched_versions.get(name):
+                self._watched_versions[name] = latest
+                results.append(self.reload_model(name, latest))
+        return results
+    
+    def tokenization_stats(self) -> Optional[Dict]:
+        text_model = self.models.resident_model('text')
+        if text_model is None or not hasattr(text_model, 'tokenization_stats'):
+            return None
+        return text_model.tokenization_stats()
+    
+    def worker_stats(self) -> Optional[Dict]:
+        if not os.environ.get('AI_SPLIT_WORKERS'):
+            return None
+        import model_workers
+        return model_workers.worker_stats()
+    
+    def record_history(self, dog_id: Optional[str], result: Dict) -> None:
+        # results for a known dog are kept for /history; failing to record never fails the analysis
+        if not dog_id:
+            return
         try:
-            result = self.models['text'].predict(symptom_text, breed, age, sex)
+            self.history.record(dog_id, result)
+        except Exception as e:
+            logger.error(f"History record error: {str(e)}")
+    
+    def _run(self, kind: str, key: Optional[str], fn, record_for: str = None) -> Dict:
+        # single-flight execution (no key: run it directly). With record_for, the computation itself writes
+        # the result to that dog's history, so callers collapsed onto it, e.g. a double-clicked submit,
+        # share one record; its key is kept apart so it only collapses with recorded calls for the same dog
+        if not record_for:
+            return fn() if key is None else self.single_flight.do(kind, key, fn)
+        
+        def recorded():
+            result = fn()
+            self.record_history(record_for, result)
+            return result
+        return recorded() if key is None else self.single_flight.do(kind, self._request_key('recorded', key, record_for), recorded)
+    
+    def model_versions(self) -> Dict[str, Optional[str]]:
+        return {name: self.models.version(name) for name in self.models.keys()}
+    
+    def analyze_text(self, symptom_text: str, breed: str = None, age: int = None, sex: str = None, record_for: str = None) -> Dict:
+        key = self._request_key('text', symptom_text, breed, age, sex)
+        return self._run('text', key, lambda: self._analyze_text(symptom_text, breed, age, sex), record_for)
+    
+    def _analyze_text(self, symptom_text: str, breed: str = None, age: int = None, sex: str = None) -> Dict:
+        try:
+            with self.models.use('text') as model, self.profiler.trace('text'):
+                result = model.predict(symptom_text, breed, age, sex)
+                model_version = getattr(model, 'model_version', None)
             return {
                 'type': 'text',
                 'status': 'success',
-                'data': result
+                'data': result,
+                'model_version': model_version
             }
         except Exception as e:
             logger.error(f"Text analysis error: {str(e)}")
@@ -94,13 +940,23 @@ class AIOrchestrator:
                 'error': str(e)
             }
     
-    def analyze_audio(self, audio_file_path: str) -> Dict:
+    def analyze_audio(self, audio_file_path: str, record_for: str = None) -> Dict:
         try:
-            result = self.models['audio'].predict(audio_file_path)
+            key = self._request_key('audio', self._file_digest(audio_file_path))
+        except OSError:
+            key = None
+        return self._run('audio', key, lambda: self._analyze_audio(audio_file_path), record_for)
+    
+    def _analyze_audio(self, audio_file_path: str) -> Dict:
+        try:
+            with self.models.use('audio') as model, self.profiler.trace('audio'):
+                result = model.predict(audio_file_path)
+                model_version = getattr(model, 'model_version', None)
             return {
                 'type': 'audio',
                 'status': 'success',
-                'data': result
+                'data': result,
+                'model_version': model_version
             }
         except Exception as e:
             logger.error(f"Audio analysis error: {str(e)}")
@@ -110,14 +966,30 @@ class AIOrchestrator:
                 'error': str(e)
             }
     
-    def analyze_image(self, image_bytes: bytes, symptoms_text: str = None) -> Dict:
+    def analyze_image(self, image_bytes: bytes, symptoms_text: str = None, dog_id: str = None, record_for: str = None) -> Dict:
+        key = self._request_key('image', image_bytes, symptoms_text, dog_id)
+        return self._run('image', key, lambda: self._analyze_image(image_bytes, symptoms_text, dog_id), record_for)
+    
+    def _analyze_image(self, image_bytes: bytes, symptoms_text: str = None, dog_id: str = None) -> Dict:
         try:
-            result = self.models['image'].predict_with_treatment(image_bytes, symptoms_text)
-            return {
+            hashes, cached = self._image_cache_lookup(dog_id, [image_bytes], symptoms_text)
+            if cached:
+                result = cached[0]
+                model_version = self.models.version('image')
+            else:
+                with self.models.use('image') as model, self.profiler.trace('image'):
+                    result = model.predict_with_treatment(image_bytes, symptoms_text)
+                    model_version = getattr(model, 'model_version', None)
+                self._image_cache_store(dog_id, hashes, {0: result}, symptoms_text, model_version)
+            analysis = {
                 'type': 'image',
                 'status': 'success',
-                'data': result
+                'data': result,
+                'model_version': model_version
             }
+            if cached:
+                analysis['cached'] = True
+            return analysis
         except Exception as e:
             logger.error(f"Image analysis error: {str(e)}")
             return {
@@ -126,31 +998,263 @@ class AIOrchestrator:
                 'error': str(e)
             }
     
+    def analyze_images(self, images: List[bytes], symptoms_text: str = None, dog_id: str = None, record_for: str = None) -> Dict:
+        key = self._request_key('images', symptoms_text, dog_id, *images)
+        return self._run('image', key, lambda: self._analyze_images(images, symptoms_text, dog_id), record_for)
+    
+    def _analyze_images(self, images: List[bytes], symptoms_text: str = None, dog_id: str = None) -> Dict:
+        try:
+            hashes, cached = self._image_cache_lookup(dog_id, images, symptoms_text)
+            missing = [index for index in range(len(images)) if index not in cached]
+            model_version = self.models.version('image')
+            predicted = {}
+            if missing:
+                # only the images with no near-duplicate on record go through the forward pass
+                with self.models.use('image') as model, self.profiler.trace('image'):
+                    results = model.predict_batch_with_treatment([images[index] for index in missing], symptoms_text)
+                    model_version = getattr(model, 'model_version', None)
+                predicted = dict(zip(missing, results))
+                self._image_cache_store(dog_id, hashes, predicted, symptoms_text, model_version)
+            
+            analysis = self._batch_result('image', [cached.get(index) or predicted[index] for index in range(len(images))], model_version)
+            if cached:
+                analysis['cached_files'] = sorted(cached)
+            return analysis
+        except Exception as e:
+            logger.error(f"Image batch analysis error: {str(e)}")
+            return {
+                'type': 'image',
+                'status': 'error',
+                'error': str(e)
+            }
+    
+    def analyze_audios(self, audio_files: List, record_for: str = None) -> Dict:
+        try:
+            key = self._request_key('audios', *[self._file_digest(audio_file) for audio_file in audio_files])
+        except OSError:
+            key = None
+        return self._run('audio', key, lambda: self._analyze_audios(audio_files), record_for)
+    
+    def _analyze_audios(self, audio_files: List) -> Dict:
+        try:
+            with self.models.use('audio') as model, self.profiler.trace('audio'):
+                results = model.predict_batch(audio_files)
+                model_version = getattr(model, 'model_version', None)
+            return self._batch_result('audio', results, model_version)
+        except Exception as e:
+            logger.error(f"Audio batch analysis error: {str(e)}")
+            return {
+                'type': 'audio',
+                'status': 'error',
+                'error': str(e)
+            }
+    
+    def _image_cache_lookup(self, dog_id: Optional[str], images: List[bytes], symptoms_text: str = None):
+        # near-duplicates are only matched among the same dog's recent photos; returns (hashes, {index: result})
+        if not dog_id or not self.image_cache.enabled:
+            return [None] * len(images), {}
+        context = (symptoms_text or '', self.models.version('image'))
+        hashes, cached = [], {}
+        for index, image_bytes in enumerate(images):
+            image_hash, result = self.image_cache.lookup(str(dog_id), image_bytes, context)
+            hashes.append(image_hash)
+            if result is not None:
+                cached[index] = result
+        return hashes, cached
+    
+    def _image_cache_store(self, dog_id: Optional[str], hashes: List, results: Dict, symptoms_text: str, model_version: str) -> None:
+        if not dog_id or not self.image_cache.enabled:
+            return
+        for index, result in results.items():
+            # a failed decode is not worth remembering
+            if not result.get('error'):
+                self.image_cache.store(str(dog_id), hashes[index], (symptoms_text or '', model_version), result)
+    
+    @staticmethod
+    def _file_rank(kind: str, data: Dict):
+        # unreadable files rank last, emergencies first, then by confidence
+        if data.get('error') or data.get('status') == 'error':
+            return (-1, 0.0)
+        if kind == 'image':
+            medical_advice = data.get('medical_advice', {})
+            return (int(bool(medical_advice.get('is_emergency'))), medical_advice.get('confidence', 0.0))
+        return (0, data.get('top_confidence', 0.0))
+    
+    def _batch_result(self, kind: str, results: List[Dict], model_version: str = None) -> Dict:
+        # `data` holds the primary file so single-file consumers keep working; every file is under `files`
+        primary = max(range(len(results)), key=lambda index: self._file_rank(kind, results[index]))
+        return {
+            'type': kind,
+            'status': 'success',
+            'data': results[primary],
+            'model_version': model_version,
+            'primary_file': primary,
+            'files': results
+        }
+    
+    def _image_task(self, images: List[bytes], symptoms_text: str = None, dog_id: str = None) -> Dict:
+        if len(images) == 1:
+            return self.analyze_image(images[0], symptoms_text, dog_id)
+        return self.analyze_images(images, symptoms_text, dog_id)
+    
+    def _audio_task(self, audio_files: List) -> Dict:
+        if len(audio_files) == 1:
+            return self.analyze_audio(audio_files[0])
+        return self.analyze_audios(audio_files)
+    
+    @staticmethod
+    def _collect_files(single, many) -> List:
+        return list(many or []) + ([single] if single else [])
+    
     def analyze_multimodal(self, 
                           symptom_text: str = None,
                           audio_file_path: str = None, 
                           image_bytes: bytes = None,
                           breed: str = None,
                           age: int = None,
-                          sex: str = None) -> Dict:
+                          sex: str = None,
+                          images: List[bytes] = None,
+                          audio_files: List = None,
+                          dog_id: str = None,
+                          record_for: str = None) -> Dict:
+        images = self._collect_files(image_bytes, images)
+        audio_files = self._collect_files(audio_file_path, audio_files)
+        
+        audio_digests = []
+        for audio_file in audio_files:
+            try:
+                audio_digests.append(self._file_digest(audio_file))
+            except OSError:
+                audio_digests.append(str(audio_file))
+        
+        key = self._request_key('multimodal', symptom_text, breed, age, sex, dog_id, len(audio_digests), *audio_digests, *images)
+        return self._run('multimodal', key, lambda: self._analyze_multimodal(
+            symptom_text, breed=breed, age=age, sex=sex, images=images, audio_files=audio_files, dog_id=dog_id
+        ), record_for)
+    
+    def _analyze_multimodal(self, 
+                           symptom_text: str = None,
+                           audio_file_path: str = None, 
+                           image_bytes: bytes = None,
+                           breed: str = None,
+                           age: int = None,
+                           sex: str = None,
+                           images: List[bytes] = None,
+                           audio_files: List = None,
+                           dog_id: str = None) -> Dict:
+        images = self._collect_files(image_bytes, images)
+        audio_files = self._collect_files(audio_file_path, audio_files)
         results = {}
         
         if symptom_text:
             results['text_analysis'] = self.analyze_text(symptom_text, breed, age, sex)
         
-        if audio_file_path:
-            results['audio_analysis'] = self.analyze_audio(audio_file_path)
+        if audio_files:
+            results['audio_analysis'] = self._audio_task(audio_files)
+        
+        if images:
+            results['image_analysis'] = self._image_task(images, symptom_text, dog_id)
+        
+        return self._multimodal_result(results, breed, age, sex)
+    
+    def keyword_triage(self) -> KeywordTriage:
+        # the keyword tables of the live text and image versions, reread only after one of them is swapped
+        paths = (self._model_paths['text'], self._model_paths['image'])
+        with self._keyword_triage_lock:
+            if self._keyword_triage is None or self._keyword_triage[0] != paths:
+                self._keyword_triage = (paths, KeywordTriage(*paths))
+            return self._keyword_triage[1]
+    
+    def triage(self, symptom_text: str, breed: str = None, age: int = None, sex: str = None) -> Dict:
+        # keyword-only urgency checks on the symptom text, ready long before any model output; they need
+        # no model weights, so they run whether or not a model is loaded. A check that fails is listed in
+        # `skipped`, and then the urgency is 'unknown' rather than 'low' unless another check flagged it
+        triage = {
+            'urgency_level': 'low',
+            'severity': None,
+            'urgent_care': False,
+            'emergency_flags': [],
+            'skipped': []
+        }
+        if not symptom_text:
+            return triage
+        
+        try:
+            keywords = self.keyword_triage()
+        except Exception as e:
+            logger.error(f"Keyword triage tables unavailable: {str(e)}")
+            triage.update(urgency_level='unknown', skipped=['severity', 'emergency_keywords'])
+            return triage
         
-        if image_bytes:
-            results['image_analysis'] = self.analyze_image(image_bytes, symptom_text)
+        try:
+            severity = keywords.assess_severity(symptom_text, breed, age, sex)
+            triage['severity'] = {'score': severity['score'], 'level': severity['level']}
+            triage['urgent_care'] = severity['urgent_care']
+            if severity['urgent_care']:
+                triage['emergency_flags'].append('Text symptoms indicate urgent care needed')
+        except Exception as e:
+            logger.error(f"Severity triage error: {str(e)}")
+            triage['skipped'].append('severity')
         
+        try:
+            triage['emergency_flags'].extend(keywords.assess_emergency_symptoms(symptom_text))
+        except Exception as e:
+            logger.error(f"Emergency keyword triage error: {str(e)}")
+            triage['skipped'].append('emergency_keywords')
+        
+        if triage['emergency_flags']:
+            triage['urgency_level'] = 'high'
+        elif triage['skipped']:
+            triage['urgency_level'] = 'unknown'
+        return triage
+    
+    def analyze_multimodal_stream(self, 
+                                 symptom_text: str = None,
+                                 audio_file_path: str = None, 
+                                 image_bytes: bytes = None,
+                                 breed: str = None,
+                                 age: int = None,
+                                 sex: str = None,
+                                 images: List[bytes] = None,
+                                 audio_files: List = None,
+                                 dog_id: str = None):
+        # yields (event, data): the triage first, then each modality as it finishes, then the fused report
+        images = self._collect_files(image_bytes, images)
+        audio_files = self._collect_files(audio_file_path, audio_files)
+        tasks = OrderedDict()
+        if symptom_text:
+            tasks['text_analysis'] = lambda: self.analyze_text(symptom_text, breed, age, sex)
+        if audio_files:
+            tasks['audio_analysis'] = lambda: self._audio_task(audio_files)
+        if images:
+            tasks['image_analysis'] = lambda: self._image_task(images, symptom_text, dog_id)
+        
+        futures = {self.stream_executor.submit(task): name for name, task in tasks.items()}
+        try:
+            yield 'triage', self.triage(symptom_text, breed, age, sex)
+            
+            results = {}
+            for future in as_completed(futures):
+                name = futures[future]
+                results[name] = future.result()
+                yield name, results[name]
+            
+            yield 'report', self._multimodal_result({name: results[name] for name in tasks}, breed, age, sex)
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def _multimodal_result(self, results: Dict, breed: str = None, age: int = None, sex: str = None) -> Dict:
         comprehensive_report = self._generate_comprehensive_report(results, breed, age, sex)
         
         return {
             'status': 'success',
             'individual_results': results,
             'comprehensive_report': comprehensive_report,
-            'analysis_timestamp': json.dumps(str(__import__('datetime').datetime.now()))
+            'model_versions': {
+                analysis['type']: analysis.get('model_version') for analysis in results.values()
+            },
+            'analysis_timestamp': datetime.now().isoformat()
         }
     
     def _generate_comprehensive_report(self, results: Dict, breed: str = None, age: int = None, sex: str = None) -> Dict:
@@ -183,33 +1287,48 @@ class AIOrchestrator:
                 report['emergency_flags'].append('Text symptoms indicate urgent care needed')
         
         if 'audio_analysis' in results and results['audio_analysis']['status'] == 'success':
-            audio_data = results['audio_analysis']['data']
-            if 'predictions' in audio_data and len(audio_data['predictions']) > 0:
-                top_audio = audio_data['predictions'][0]
-                report['primary_diagnoses'].append({
-                    'source': 'audio_analysis',
-                    'diagnosis': top_audio.get('disease', 'Unknown'),
-                    'confidence': top_audio.get('confidence', 0.0),
-                    'treatments': []
-                })
+            audio_files = results['audio_analysis'].get('files', [results['audio_analysis']['data']])
+            for index, audio_data in enumerate(audio_files):
+                if 'predictions' in audio_data and len(audio_data['predictions']) > 0:
+                    top_audio = audio_data['predictions'][0]
+                    diagnosis = {
+                        'source': 'audio_analysis',
+                        'diagnosis': top_audio.get('disease', 'Unknown'),
+                        'confidence': top_audio.get('confidence', 0.0),
+                        'treatments': []
+                    }
+                    if len(audio_files) > 1:
+                        diagnosis['file_index'] = index
+                    report['primary_diagnoses'].append(diagnosis)
         
         if 'image_analysis' in results and results['image_analysis']['status'] == 'success':
-            image_data = results['image_analysis']['data']
-            if 'medical_advice' in image_data:
-                medical_advice = image_data['medical_advice']
-                report['primary_diagnoses'].append({
-                    'source': 'image_analysis',
-                    'diagnosis': medical_advice.get('diagnosis', 'Unknown'),
-                    'confidence': medical_advice.get('confidence', 0.0),
-                    'treatments': medical_advice.get('treatments', [])
-                })
-                
-                if medical_advice.get('is_emergency', False):
-                    report['urgency_level'] = 'high'
-                    report['emergency_flags'].append('Image analysis indicates emergency condition')
+            image_files = results['image_analysis'].get('files', [results['image_analysis']['data']])
+            for index, image_data in enumerate(image_files):
+                if 'medical_advice' in image_data:
+                    medical_advice = image_data['medical_advice']
+                    diagnosis = {
+                        'source': 'image_analysis',
+                        'diagnosis': medical_advice.get('diagnosis', 'Unknown'),
+                        'confidence': medical_advice.get('confidence', 0.0),
+                        'treatments': medical_advice.get('treatments', [])
+                    }
+                    if len(image_files) > 1:
+                        diagnosis['file_index'] = index
+                    report['primary_diagnoses'].append(diagnosis)
+                    
+                    if medical_advice.get('is_emergency', False):
+                        report['urgency_level'] = 'high'
+                        flag = 'Image analysis indicates emergency condition'
+                        if flag not in report['emergency_flags']:
+                            report['emergency_flags'].append(flag)
         
         if report['primary_diagnoses']:
-            avg_confidence = sum(d['confidence'] for d in report['primary_diagnoses']) / len(report['primary_diagnoses'])
+            # averaged per modality first, so five photos weigh no more than one and the assessment
+            # doesn't shift with how many files were uploaded
+            by_source = {}
+            for diagnosis in report['primary_diagnoses']:
+                by_source.setdefault(diagnosis['source'], []).append(diagnosis['confidence'])
+            avg_confidence = sum(sum(scores) / len(scores) for scores in by_source.values()) / len(by_source)
             report['overall_confidence'] = avg_confidence
             
             if report['urgency_level'] == 'high':
@@ -242,8 +1361,81 @@ def initialize_orchestrator():
     global orchestrator
     if orchestrator is None:
         orchestrator = AIOrchestrator()
+        if MODEL_WATCH_SECONDS > 0:
+            threading.Thread(target=_watch_model_registry, daemon=True, name='model-watch').start()
     return orchestrator
 
+def _watch_model_registry():
+    # polls the on-disk registries and hot-swaps any model with a newer deployed version
+    while True:
+        time.sleep(MODEL_WATCH_SECONDS)
+        try:
+            for result in orchestrator.reload_latest_models():
+                logger.info(f"Hot-reloaded {result['model']} to version {result['version']}")
+        except Exception as e:
+            logger.error(f"Model registry watch error: {str(e)}")
+
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+TREATMENT_KEYS = ('treatments', 'top_treatments', 'treatment_recommendations')
+
+def _compact_payload(payload: Dict) -> Dict:
+    # replaces repeated treatment strings with indices into a shared table and timestamps with epoch seconds
+    table = []
+    index = {}
+    
+    def ref(treatment):
+        if not isinstance(treatment, str):
+            return treatment
+        if treatment not in index:
+            index[treatment] = len(table)
+            table.append(treatment)
+        return index[treatment]
+    
+    def walk(node):
+        if isinstance(node, dict):
+            compact = {}
+            for key, value in node.items():
+                if key in TREATMENT_KEYS and isinstance(value, list):
+                    compact[key] = [ref(t) for t in value]
+                elif key == 'analysis_timestamp' and isinstance(value, str):
+                    try:
+                        compact['analysis_time'] = datetime.fromisoformat(value).timestamp()
+                    except ValueError:
+                        compact[key] = value
+                else:
+                    compact[key] = walk(value)
+            return compact
+        if isinstance(node, list):
+            return [walk(item) for item in node]
+        return node
+    
+    compact = walk(payload)
+    if table:
+        compact['treatment_table'] = table
+    return compact
+
+def _respond(payload: Dict, status: int = 200):
+    # response options: ?fields=a,b selects top-level keys, ?format=compact or an msgpack Accept header trims the payload
+    fields = request.args.get('fields')
+    if fields and isinstance(payload, dict):
+        wanted = {f.strip() for f in fields.split(',') if f.strip()}
+        payload = {k: v for k, v in payload.items() if k in wanted}
+    
+    response_format = request.args.get('format', '').lower()
+    wants_msgpack = response_format == 'msgpack' or (
+        request.accept_mimetypes.best == MSGPACK_MIMETYPE
+    )
+    
+    if wants_msgpack and msgpack is not None:
+        body = msgpack.packb(_compact_payload(payload), use_bin_type=True)
+        return Response(body, status=status, mimetype=MSGPACK_MIMETYPE)
+    
+    if response_format == 'compact' or wants_msgpack:
+        body = json.dumps(_compact_payload(payload), separators=(',', ':'))
+        return Response(body, status=status, mimetype='application/json')
+    
+    return jsonify(payload), status
+
 @app.route('/health', methods=['GET'])
 def health_check():
     try:
@@ -251,6 +1443,14 @@ def health_check():
         return jsonify({
             'status': 'healthy',
             'models_loaded': list(orchestrator.models.keys()),
+            'jobs': job_store.stats(),
+            'single_flight': orchestrator.single_flight.stats(),
+            'image_cache': orchestrator.image_cache.stats(),
+            'history': orchestrator.history.stats(),
+            'model_versions': orchestrator.model_versions(),
+            'model_residency': orchestrator.models.stats(),
+            'text_tokenization': orchestrator.tokenization_stats(),
+            'workers': orchestrator.worker_stats(),
             'service': 'AI Model Orchestrator'
         })
     except Exception as e:
@@ -259,6 +1459,14 @@ def health_check():
             'error': str(e)
         }), 500
 
+def _request_dog_id(submitted: Optional[str]) -> Optional[str]:
+    # the Node tier's /api/ai routes relay the client's body untouched, with X-Verified-Dog-Id standing in for
+    # its dog_id (empty: no dog checked against the session), so a client-chosen id never reaches the history
+    # or the per-dog image cache
+    if 'X-Verified-Dog-Id' in request.headers:
+        return request.headers['X-Verified-Dog-Id'] or None
+    return submitted
+
 @app.route('/analyze/text', methods=['POST'])
 def analyze_text():
     try:
@@ -271,10 +1479,11 @@ def analyze_text():
             symptom_text=data['symptom_text'],
             breed=data.get('breed'),
             age=data.get('age'),
-            sex=data.get('sex')
+            sex=data.get('sex'),
+            record_for=_request_dog_id(data.get('dog_id'))
         )
         
-        return jsonify(result)
+        return _respond(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -284,19 +1493,20 @@ def analyze_audio():
         if 'audio' not in request.files:
             return jsonify({'error': 'No audio file provided'}), 400
         
-        file = request.files['audio']
-        if file.filename == '':
+        files = [file for file in request.files.getlist('audio') if file.filename]
+        if not files:
             return jsonify({'error': 'No file selected'}), 400
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-            file.save(tmp_file.name)
-            
-            orchestrator = initialize_orchestrator()
-            result = orchestrator.analyze_audio(tmp_file.name)
-        
-        os.unlink(tmp_file.name)
+        # decode straight from the parsed upload streams rather than copying them to other temp files;
+        # several clips are scored together in one batched model call
+        orchestrator = initialize_orchestrator()
+        dog_id = _request_dog_id(request.form.get('dog_id'))
+        if len(files) == 1:
+            result = orchestrator.analyze_audio(files[0].stream, record_for=dog_id)
+        else:
+            result = orchestrator.analyze_audios([file.stream for file in files], record_for=dog_id)
         
-        return jsonify(result)
+        return _respond(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -306,80 +1516,378 @@ def analyze_image():
         if 'image' not in request.files:
             return jsonify({'error': 'No image file provided'}), 400
         
-        file = request.files['image']
-        if file.filename == '':
+        files = [file for file in request.files.getlist('image') if file.filename]
+        if not files:
             return jsonify({'error': 'No file selected'}), 400
         
-        image_bytes = file.read()
+        images = [file.read() for file in files]
         symptoms_text = request.form.get('symptoms', '')
+        dog_id = _request_dog_id(request.form.get('dog_id'))
         
         orchestrator = initialize_orchestrator()
-        result = orchestrator.analyze_image(image_bytes, symptoms_text)
+        if len(images) == 1:
+            result = orchestrator.analyze_image(images[0], symptoms_text, dog_id, record_for=dog_id)
+        else:
+            result = orchestrator.analyze_images(images, symptoms_text, dog_id, record_for=dog_id)
         
-        return jsonify(result)
+        return _respond(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _parse_comprehensive_request(spool_audio: bool = False) -> Dict:
+    # audio is passed on as the upload stream; spool_audio copies it to a temp file for work outliving the request
+    if request.content_type and 'multipart/form-data' in request.content_type:
+        symptom_text = request.form.get('symptom_text', '')
+        dog_id = _request_dog_id(request.form.get('dog_id'))
+        breed = request.form.get('breed')
+        age = request.form.get('age')
+        sex = request.form.get('sex')
+        
+        if age:
+            try:
+                age = int(age)
+            except ValueError:
+                age = None
+        
+        audio_files = []
+        images = []
+        
+        # every repeated `audio` / `image` field is analysed, batched per model
+        for audio_file in request.files.getlist('audio'):
+            if audio_file.filename:
+                if spool_audio:
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
+                        audio_file.save(tmp_file.name)
+                        audio_files.append(tmp_file.name)
+                else:
+                    audio_files.append(audio_file.stream)
+        
+        for image_file in request.files.getlist('image'):
+            if image_file.filename:
+                images.append(image_file.read())
+    
+    else:
+        data = request.get_json()
+        if not data:
+            raise ValueError('No data provided')
+        
+        symptom_text = data.get('symptom_text', '')
+        dog_id = _request_dog_id(data.get('dog_id'))
+        breed = data.get('breed')
+        age = data.get('age')
+        sex = data.get('sex')
+        audio_files = []
+        images = []
+    
+    return {
+        'symptom_text': symptom_text,
+        'audio_files': audio_files,
+        'images': images,
+        'breed': breed,
+        'age': age,
+        'sex': sex,
+        'dog_id': dog_id
+    }
+
+def _cleanup_audio(params: Dict) -> None:
+    for audio_file in params['audio_files']:
+        if isinstance(audio_file, str) and os.path.exists(audio_file):
+            os.unlink(audio_file)
+
+STREAM_MIMETYPES = {'sse': 'text/event-stream', 'ndjson': 'application/x-ndjson'}
+
+def _stream_format() -> Optional[str]:
+    # ?stream=sse|ndjson, or an Accept header asking for one of the two
+    requested = request.args.get('stream', '').lower()
+    if requested in STREAM_MIMETYPES:
+        return requested
+    for stream_format, mimetype in STREAM_MIMETYPES.items():
+        if request.accept_mimetypes.best == mimetype:
+            return stream_format
+    return None
+
+def _recorded_events(orchestrator, events, dog_id: Optional[str]):
+    # a streamed analysis is never collapsed with another, so it is recorded here, once, as its fused report
+    try:
+        for event, data in events:
+            if event == 'report':
+                orchestrator.record_history(dog_id, data)
+            yield event, data
+    finally:
+        events.close()
+
+def _stream_response(events, stream_format: str, params: Dict) -> Response:
+    def generate():
+        try:
+            for event, data in events:
+                if stream_format == 'sse':
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                else:
+                    yield json.dumps({'event': event, 'data': data}) + '\n'
+        except Exception as e:
+            logger.error(f"Streaming analysis error: {str(e)}")
+            if stream_format == 'sse':
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            else:
+                yield json.dumps({'event': 'error', 'data': {'error': str(e)}}) + '\n'
+    
+    def close():
+        events.close()
+        _cleanup_audio(params)
+    
+    response = Response(generate(), mimetype=STREAM_MIMETYPES[stream_format])
+    # runs when the server is done with the response, including when the client went away mid-stream
+    response.call_on_close(close)
+    # every event has to reach the client as soon as it is written
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/analyze/comprehensive', methods=['POST'])
 def analyze_comprehensive():
     try:
         orchestrator = initialize_orchestrator()
+        stream_format = _stream_format()
         
-        if request.content_type and 'multipart/form-data' in request.content_type:
-            symptom_text = request.form.get('symptom_text', '')
-            breed = request.form.get('breed')
-            age = request.form.get('age')
-            sex = request.form.get('sex')
-            
-            if age:
-                try:
-                    age = int(age)
-                except ValueError:
-                    age = None
-            
-            audio_file_path = None
-            image_bytes = None
-            
-            if 'audio' in request.files:
-                audio_file = request.files['audio']
-                if audio_file.filename:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-                        audio_file.save(tmp_file.name)
-                        audio_file_path = tmp_file.name
-            
-            if 'image' in request.files:
-                image_file = request.files['image']
-                if image_file.filename:
-                    image_bytes = image_file.read()
+        try:
+            # a streamed response outlives the request's upload stream, so its audio is spooled first
+            params = _parse_comprehensive_request(spool_audio=stream_format is not None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        else:
-            data = request.get_json()
-            if not data:
-                return jsonify({'error': 'No data provided'}), 400
-            
-            symptom_text = data.get('symptom_text', '')
-            breed = data.get('breed')
-            age = data.get('age')
-            sex = data.get('sex')
-            audio_file_path = None
-            image_bytes = None
-        
-        result = orchestrator.analyze_multimodal(
-            symptom_text=symptom_text,
-            audio_file_path=audio_file_path,
-            image_bytes=image_bytes,
-            breed=breed,
-            age=age,
-            sex=sex
-        )
+        if stream_format:
+            events = _recorded_events(orchestrator, orchestrator.analyze_multimodal_stream(**params), params['dog_id'])
+            return _stream_response(events, stream_format, params)
+        
+        try:
+            result = orchestrator.analyze_multimodal(**params, record_for=params['dog_id'])
+        finally:
+            _cleanup_audio(params)
+        
+        return _respond(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+job_store = JobStore()
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='ai-job')
+job_slots = threading.BoundedSemaphore(JOB_QUEUE_MAX)
+
+def _submit_job(fn, *args) -> Optional[str]:
+    # returns the job id, or None when the executor queue or the job store is full
+    if not job_slots.acquire(blocking=False):
+        return None
+    job_id = job_store.create()
+    if job_id is None:
+        job_slots.release()
+        return None
+    job_executor.submit(fn, job_id, *args).add_done_callback(lambda future: job_slots.release())
+    return job_id
+
+def _jobs_full_response():
+    response = jsonify({'error': 'Too many pending jobs, retry later'})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def _run_comprehensive_job(job_id: str, params: Dict) -> None:
+    job_store.update(job_id, status='running')
+    try:
+        orchestrator = initialize_orchestrator()
+        result = orchestrator.analyze_multimodal(**params, record_for=params['dog_id'])
+        job_store.update(job_id, status='completed', result=result)
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        job_store.update(job_id, status='failed', error=str(e))
+    finally:
+        _cleanup_audio(params)
+
+@app.route('/jobs/comprehensive', methods=['POST'])
+def submit_comprehensive_job():
+    try:
+        try:
+            params = _parse_comprehensive_request(spool_audio=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        job_id = _submit_job(_run_comprehensive_job, params)
+        if job_id is None:
+            _cleanup_audio(params)
+            return _jobs_full_response()
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/jobs/{job_id}'
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _run_reload_job(job_id: str, name: str, version: Optional[str]) -> None:
+    job_store.update(job_id, status='running')
+    try:
+        result = initialize_orchestrator().reload_model(name, version)
+        job_store.update(job_id, status='completed', result=result)
+    except Exception as e:
+        logger.error(f"Reload job {job_id} failed: {str(e)}")
+        job_store.update(job_id, status='failed', error=str(e))
+
+def _history_before(value: Optional[str]) -> Optional[float]:
+    # a unix timestamp or an ISO 8601 datetime
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.route('/history/<dog_id>', methods=['GET'])
+def get_history(dog_id):
+    try:
+        try:
+            limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+            before = _history_before(request.args.get('before'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        orchestrator = initialize_orchestrator()
+        trends = orchestrator.history.trends(dog_id)
+        return _respond({
+            'dog_id': dog_id,
+            'total': trends['analyses'] if trends else 0,
+            'analyses': orchestrator.history.history(
+                dog_id, limit, before, include_results=request.args.get('results', 'true').lower() != 'false'
+            ),
+            'trends': trends
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/history/<dog_id>/trends', methods=['GET'])
+def get_history_trends(dog_id):
+    try:
+        orchestrator = initialize_orchestrator()
+        trends = orchestrator.history.trends(dog_id)
+        if trends is None:
+            return jsonify({'error': f'No analysis history for {dog_id}'}), 404
+        return _respond({'dog_id': dog_id, 'trends': trends})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    orchestrator = initialize_orchestrator()
+    return jsonify({
+        name: {
+            'active_version': orchestrator.models.version(name),
+            'available_versions': list(registry.versions().keys())
+        }
+        for name, registry in orchestrator.registries.items()
+    })
+
+@app.route('/models/<name>/reload', methods=['POST'])
+def reload_model(name):
+    auth_error = _token_auth_error(ADMIN_TOKEN, 'X-Admin-Token')
+    if auth_error:
+        return auth_error
+    try:
+        orchestrator = initialize_orchestrator()
+        data = request.get_json(silent=True) or {}
+        version = data.get('version')
         
-        if audio_file_path and os.path.exists(audio_file_path):
-            os.unlink(audio_file_path)
+        if name not in orchestrator.registries:
+            return jsonify({'error': f'Unknown model: {name}'}), 404
+        if version and version not in orchestrator.registries[name].versions():
+            return jsonify({'error': f'Unknown model version: {version}'}), 400
         
-        return jsonify(result)
+        # loading and warm-up run in the background; the swap happens once the new version is ready
+        job_id = _submit_job(_run_reload_job, name, version)
+        if job_id is None:
+            return _jobs_full_response()
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/jobs/{job_id}'
+        }), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return _respond(job)
+
+def _token_auth_error(expected: str, token_header: str):
+    # hidden unless a token is configured; it is sent as a bearer token or in `token_header`
+    if not expected:
+        return jsonify({'error': 'Not found'}), 404
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else request.headers.get(token_header, '')
+    if not hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
+
+def _profile_auth_error():
+    return _token_auth_error(PROFILE_TOKEN, 'X-Profile-Token')
+
+def _run_profile_job(job_id: str, options: Dict) -> None:
+    job_store.update(job_id, status='running')
+    try:
+        result = initialize_orchestrator().profiler.record(job_id, **options)
+        result['downloads'] = {name: f'/debug/profile/{job_id}/{name}' for name in result['artifacts']}
+        job_store.update(job_id, status='completed', result=result)
+    except Exception as e:
+        logger.error(f"Profile job {job_id} failed: {str(e)}")
+        job_store.update(job_id, status='failed', error=str(e))
+
+@app.route('/debug/profile', methods=['POST'])
+def start_profile():
+    auth_error = _profile_auth_error()
+    if auth_error:
+        return auth_error
+    try:
+        orchestrator = initialize_orchestrator()
+        data = request.get_json(silent=True) or {}
+        seconds = float(data.get('seconds', 10))
+        if not 0 < seconds <= PROFILE_MAX_SECONDS:
+            return jsonify({'error': f'seconds must be between 0 and {PROFILE_MAX_SECONDS:g}'}), 400
+        if orchestrator.profiler.active:
+            return jsonify({'error': 'A profiling session is already running'}), 409
+        
+        options = {
+            'seconds': seconds,
+            'interval_ms': max(1.0, float(data.get('interval_ms', 10))),
+            'torch_ops': bool(data.get('torch', True)),
+            'tf_ops': bool(data.get('tensorflow', True))
+        }
+        
+        # the session runs on its own thread so it never holds up queued analysis jobs
+        job_id = job_store.create()
+        if job_id is None:
+            return _jobs_full_response()
+        threading.Thread(target=_run_profile_job, args=(job_id, options), daemon=True, name='profile').start()
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/jobs/{job_id}'
+        }), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/debug/profile/<job_id>/<artifact>', methods=['GET'])
+def download_profile(job_id, artifact):
+    auth_error = _profile_auth_error()
+    if auth_error:
+        return auth_error
+    path = initialize_orchestrator().profiler.artifact_path(job_id, artifact)
+    if path is None:
+        return jsonify({'error': 'Profile artifact not found'}), 404
+    return send_file(path, as_attachment=True, download_name=f'{job_id[:8]}-{artifact}')
+
 if __name__ == '__main__':
     initialize_orchestrator()
     print("AI Model Orchestrator Service Started!")
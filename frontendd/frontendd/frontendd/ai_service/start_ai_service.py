@@ -53,7 +53,7 @@ def check_model_files():
     print("All model directories found")
     return True
 
-def start_service():
+def start_service(split=False):
     orchestrator_file = Path(__file__).parent / "orchestrator.py"
     if not orchestrator_file.exists():
         print("orchestrator.py not found")
@@ -61,9 +61,11 @@ def start_service():
     
     print("Starting AI Model Orchestrator Service...")
     try:
+        # --split runs the models in separate PyTorch and TensorFlow worker processes
+        env = dict(os.environ, AI_SPLIT_WORKERS='1') if split else None
         process = subprocess.Popen([
             sys.executable, str(orchestrator_file)
-        ])
+        ], env=env)
         
         time.sleep(3)
         if process.poll() is None:
@@ -74,6 +76,13 @@ def start_service():
             print("   - POST /analyze/audio - Audio analysis")
             print("   - POST /analyze/image - Image analysis")
             print("   - POST /analyze/comprehensive - Multimodal analysis")
+            print("   - POST /jobs/comprehensive - Queue multimodal analysis job")
+            print("   - GET  /jobs/<id> - Poll job status and result")
+            print("   - GET  /models - Active and deployed model versions")
+            if os.environ.get('AI_ADMIN_TOKEN'):
+                print("   - POST /models/<name>/reload - Hot-swap a model version (token required)")
+            if os.environ.get('AI_PROFILE_TOKEN'):
+                print("   - POST /debug/profile - Record a profile of live traffic (token required)")
             print("\nPress Ctrl+C to stop the service")
             
             try:
@@ -109,7 +118,7 @@ def main():
     
     print("\n" + "=" * 50)
     
-    start_service()
+    start_service(split='--split' in sys.argv)
 
 if __name__ == "__main__":
     main()
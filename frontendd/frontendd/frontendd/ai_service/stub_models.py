@@ -0,0 +1,124 @@
+import os
+import time
+import zlib
+
+# framework-free stand-ins for the three model classes, returning results shaped like the real ones;
+# AI_STUB_LATENCY_MS is a single value or per model, e.g. "text=5,image=40,audio=60"
+
+URGENT_WORDS = ('bleeding', 'seizure', 'difficulty breathing', 'collapse')
+
+def _stub_latency(kind):
+    setting = os.environ.get('AI_STUB_LATENCY_MS', '0')
+    if '=' not in setting:
+        return float(setting) / 1000
+    for part in setting.split(','):
+        name, _, value = part.partition('=')
+        if name.strip() == kind:
+            return float(value) / 1000
+    return 0.0
+
+def _read(source):
+    # bytes, a decoded array, a file-like object or a path
+    if isinstance(source, bytes):
+        return source
+    if hasattr(source, 'tobytes'):
+        return source.tobytes()
+    if hasattr(source, 'read'):
+        return source.read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+def _stub_confidence(data):
+    return 0.5 + (zlib.crc32(data) % 500) / 1000
+
+class StubTextClassifier:
+    def __init__(self, model_assets_path):
+        self.model_assets_path = model_assets_path
+        self.latency = _stub_latency('text')
+
+    def predict(self, symptom_text, breed=None, age=None, sex=None, top_k=3):
+        time.sleep(self.latency)
+        confidence = _stub_confidence(symptom_text.encode('utf-8'))
+        severity = self.assess_severity(symptom_text, breed, age, sex)
+        prediction = {
+            'disease': 'Stub Condition',
+            'confidence': confidence,
+            'confidence_level': 'High confidence' if confidence > 0.7 else 'Moderate confidence',
+            'explanation': 'Stub model output',
+            'treatments': ['Stub treatment'],
+            'severity': 1
+        }
+        return {
+            'symptoms': symptom_text,
+            'demographics': {'breed': breed, 'age': age, 'sex': sex},
+            'severity': {'score': severity['score'], 'level': severity['level']},
+            'urgent_care': severity['urgent_care'],
+            'predictions': [prediction],
+            'top_disease': prediction['disease'],
+            'top_confidence': confidence,
+            'top_treatments': prediction['treatments']
+        }
+
+    def assess_severity(self, symptom_text, breed=None, age=None, sex=None):
+        urgent = any(word in symptom_text.lower() for word in URGENT_WORDS)
+        return {'score': 3 if urgent else 1, 'level': 'severe' if urgent else 'mild', 'urgent_care': urgent}
+
+class StubAudioClassifier:
+    def __init__(self, model_assets_path):
+        self.model_assets_path = model_assets_path
+        self.latency = _stub_latency('audio')
+
+    def predict(self, audio_path, top_k=3):
+        return self.predict_batch([audio_path], top_k)[0]
+    
+    def predict_batch(self, audio_paths, top_k=3):
+        # one simulated model call however many clips are scored
+        time.sleep(self.latency)
+        return [self._result(_read(audio_path)) for audio_path in audio_paths]
+    
+    def _result(self, data):
+        confidence = _stub_confidence(data)
+        return {
+            'predictions': [{
+                'disease': 'Stub Sound',
+                'confidence': confidence,
+                'confidence_level': 'Moderate confidence',
+                'explanation': 'Stub model output',
+                'class_index': 0
+            }],
+            'top_disease': 'Stub Sound',
+            'top_confidence': confidence,
+            'status': 'success'
+        }
+
+class StubImagePredictor:
+    def __init__(self, model_assets_path):
+        self.model_assets_path = model_assets_path
+        self.latency = _stub_latency('image')
+
+    def predict_with_treatment(self, image_bytes, symptoms_text=None):
+        return self.predict_batch_with_treatment([image_bytes], symptoms_text)[0]
+    
+    def predict_batch_with_treatment(self, images, symptoms_text=None):
+        time.sleep(self.latency)
+        return [self._report(_read(image)) for image in images]
+    
+    def _report(self, data):
+        confidence = _stub_confidence(data)
+        return {
+            'primary_diagnosis': 'stub_condition',
+            'confidence': confidence,
+            'differential_diagnoses': [],
+            'medical_advice': {
+                'diagnosis': 'stub_condition',
+                'treatments': ['Stub treatment'],
+                'is_emergency': False,
+                'urgency_level': 'low',
+                'confidence': confidence,
+                'recommendation': 'Stub model output'
+            },
+            'disclaimer': 'Stub model output for load testing.'
+        }
+    
+    def assess_emergency_symptoms(self, symptoms_text):
+        return []
@@ -8,7 +8,12 @@ from flask_cors import CORS
 import joblib
 import json
 import tempfile
+import shutil
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from model_runtime.audio_io import resample_type, decode_window, resample
 
 class DogAudioClassifier:
     def __init__(self, model_assets_path):
@@ -30,86 +35,177 @@ class DogAudioClassifier:
         
         self.SAMPLE_RATE = self.config["sample_rate"]
         self.DURATION = self.config["duration"]
+        self.NUM_SAMPLES = int(self.SAMPLE_RATE * self.DURATION)
+        
+        # resample_quality: "fast", "balanced" or "high"; see model_runtime.audio_io
+        self.RES_TYPE = resample_type(self.config.get("resample_quality", "high"))
         
         # loading YAMNet model
         self.yamnet_model = hub.load('https://tfhub.dev/google/yamnet/1')
+        
+        # compiling the fused serving graph up front so no request pays the trace
+        self.serve = self._build_serving_function()
+    
+    def _decode_fallback(self, source):
+        # compressed formats (mp3, m4a) go through librosa/audioread, which needs a real file
+        if not hasattr(source, 'read'):
+            return librosa.load(source, sr=None, mono=True, duration=self.DURATION)
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
+            shutil.copyfileobj(source, tmp_file)
+        try:
+            return librosa.load(tmp_file.name, sr=None, mono=True, duration=self.DURATION)
+        finally:
+            os.unlink(tmp_file.name)
+    
+    def _load_audio(self, audio_path):
+        # accepts a path or a file-like upload; returns mono float32 audio at SAMPLE_RATE
+        decoded = decode_window(audio_path, self.DURATION)
+        if decoded is None:
+            decoded = self._decode_fallback(audio_path)
+        audio, native_sr = decoded
+        return resample(audio, native_sr, self.SAMPLE_RATE, self.RES_TYPE)
+    
+    def preprocess_audio(self, audio_path, out=None):
+        return self.fit_waveform(self._load_audio(audio_path), out)
+    
+    def fit_waveform(self, audio, out=None):
+        # writing a fixed-length, peak-normalized clip into a preallocated float32 buffer (or the given row)
+        waveform = out if out is not None else np.empty(self.NUM_SAMPLES, dtype=np.float32)
+        length = min(len(audio), self.NUM_SAMPLES)
+        waveform[:length] = audio[:length]
+        waveform[length:] = 0.0
+        
+        # normalizing audio
+        peak = np.max(np.abs(waveform[:length])) if length else 0.0
+        if peak > 0:
+            waveform *= np.float32(1.0 / peak)
+        
+        return waveform
+    
+    def _embed(self, waveform):
+        # YAMNet takes a single 1-D waveform, mean pooling its per-frame embeddings
+        scores, embeddings, spectrogram = self.yamnet_model(waveform)
+        return tf.reduce_mean(embeddings, axis=0)
+    
+    def _forward(self, waveforms):
+        embeddings = tf.map_fn(
+            self._embed, waveforms,
+            fn_output_signature=tf.TensorSpec([self.config["input_dim"]], tf.float32)
+        )
+        return self.model(embeddings, training=False)
+    
+    def _build_serving_function(self):
+        # one traced graph for YAMNet, pooling and the classifier head; the fixed signature covers any batch size
+        input_signature = [tf.TensorSpec(shape=[None, self.NUM_SAMPLES], dtype=tf.float32)]
+        warmup = tf.zeros([1, self.NUM_SAMPLES], dtype=tf.float32)
+        
+        if self.config.get("xla", False):
+            try:
+                serve = tf.function(self._forward, input_signature=input_signature, jit_compile=True)
+                serve(warmup)
+                return serve
+            except Exception as e:
+                print(f"XLA compilation failed, using standard graph: {str(e)}")
+        
+        serve = tf.function(self._forward, input_signature=input_signature)
+        serve(warmup)
+        return serve
     
     def extract_yamnet_features(self, audio_path):
         # extracting YAMNet features from audio file
         try:
-            # loading and preprocessing audio
-            audio, sr = librosa.load(audio_path, sr=self.SAMPLE_RATE, duration=self.DURATION)
-            
-            # padding if shorter than duration
-            if len(audio) < self.SAMPLE_RATE * self.DURATION:
-                audio = np.pad(audio, (0, int(self.SAMPLE_RATE * self.DURATION) - len(audio)), mode='constant')
-            
-            # normalizing audio
-            audio = audio.astype(np.float32)
-            if np.max(np.abs(audio)) > 0:
-                audio = audio / np.max(np.abs(audio))
-            
-            # getting YAMNet embeddings
-            scores, embeddings, spectrogram = self.yamnet_model(audio)
-            mean_embedding = tf.reduce_mean(embeddings, axis=0).numpy()
-            
-            return mean_embedding
+            audio = self.preprocess_audio(audio_path)
+            return self._embed(audio).numpy()
             
         except Exception as e:
             raise Exception(f"Audio processing error: {str(e)}")
     
+    def _format_predictions(self, probabilities, top_k):
+        top_k = min(top_k, self.config["num_classes"])
+        
+        # getting top predictions
+        top_indices = np.argsort(probabilities)[-top_k:][::-1]
+        top_probs = probabilities[top_indices]
+        
+        results = []
+        for i, (idx, prob) in enumerate(zip(top_indices, top_probs)):
+            disease = self.label_encoder.inverse_transform([idx])[0]
+            
+            # generating confidence explanation
+            if prob > 0.7:
+                confidence_level = "High confidence"
+                explanation = "Clear audio patterns match this condition"
+            elif prob > 0.5:
+                confidence_level = "Moderate confidence" 
+                explanation = "Good audio alignment with some uncertainty"
+            elif prob > 0.3:
+                confidence_level = "Low confidence"
+                explanation = "Audio features could indicate multiple conditions"
+            else:
+                confidence_level = "Very low confidence"
+                explanation = "Limited audio information available"
+            
+            results.append({
+                'disease': disease, 
+                'confidence': float(prob),
+                'confidence_level': confidence_level,
+                'explanation': explanation,
+                'class_index': int(idx)
+            })
+        
+        return {
+            'predictions': results,
+            'top_disease': results[0]['disease'],
+            'top_confidence': results[0]['confidence'],
+            'status': 'success'
+        }
+    
     def predict(self, audio_path, top_k=3):
         try:
-            # extracting features
-            features = self.extract_yamnet_features(audio_path)
-            features = features.reshape(1, -1)
+            try:
+                waveform = self.preprocess_audio(audio_path)
+            except Exception as e:
+                raise Exception(f"Audio processing error: {str(e)}")
             
             # getting prediction
-            predictions = self.model.predict(features, verbose=0)
-            top_k = min(top_k, self.config["num_classes"])
-            
-            # getting top predictions
-            top_indices = np.argsort(predictions[0])[-top_k:][::-1]
-            top_probs = predictions[0][top_indices]
-            
-            results = []
-            for i, (idx, prob) in enumerate(zip(top_indices, top_probs)):
-                disease = self.label_encoder.inverse_transform([idx])[0]
-                
-                # generating confidence explanation
-                if prob > 0.7:
-                    confidence_level = "High confidence"
-                    explanation = "Clear audio patterns match this condition"
-                elif prob > 0.5:
-                    confidence_level = "Moderate confidence" 
-                    explanation = "Good audio alignment with some uncertainty"
-                elif prob > 0.3:
-                    confidence_level = "Low confidence"
-                    explanation = "Audio features could indicate multiple conditions"
-                else:
-                    confidence_level = "Very low confidence"
-                    explanation = "Limited audio information available"
-                
-                results.append({
-                    'disease': disease, 
-                    'confidence': float(prob),
-                    'confidence_level': confidence_level,
-                    'explanation': explanation,
-                    'class_index': int(idx)
-                })
-            
-            return {
-                'predictions': results,
-                'top_disease': results[0]['disease'],
-                'top_confidence': results[0]['confidence'],
-                'status': 'success'
-            }
+            predictions = self.serve(waveform[np.newaxis, :]).numpy()
+            return self._format_predictions(predictions[0], top_k)
             
         except Exception as e:
             return {
                 'error': str(e),
                 'status': 'error'
             }
+    
+    def predict_batch(self, audio_paths, top_k=3):
+        # decoding every clip (a path, file-like or array already at SAMPLE_RATE), then scoring them all in one graph call
+        waveforms = np.zeros((len(audio_paths), self.NUM_SAMPLES), dtype=np.float32)
+        errors = {}
+        for i, audio_path in enumerate(audio_paths):
+            try:
+                if isinstance(audio_path, np.ndarray):
+                    self.fit_waveform(audio_path, out=waveforms[i])
+                else:
+                    self.preprocess_audio(audio_path, out=waveforms[i])
+            except Exception as e:
+                errors[i] = f"Audio processing error: {str(e)}"
+        
+        valid = [i for i in range(len(audio_paths)) if i not in errors]
+        predictions = self.predict_waveforms(waveforms[valid], top_k) if valid else []
+        
+        results = [None] * len(audio_paths)
+        for row, i in enumerate(valid):
+            results[i] = predictions[row]
+        for i, error in errors.items():
+            results[i] = {'error': error, 'status': 'error'}
+        
+        return results
+    
+    def predict_waveforms(self, waveforms, top_k=3):
+        # scoring an already preprocessed [batch, NUM_SAMPLES] array in one graph call
+        predictions = self.serve(waveforms).numpy()
+        return [self._format_predictions(row, top_k) for row in predictions]
 
 # flask app
 app = Flask(__name__)
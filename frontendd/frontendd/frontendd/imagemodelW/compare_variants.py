@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+model_assets_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_assets')
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_runtime.loading import load_model_class
+
+SkinDiseasePredictor = load_model_class('image', model_assets_path)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def latency_summary(latencies):
+    return {
+        'mean_ms': sum(latencies) / len(latencies),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95)
+    }
+
+def time_predictions(predictor, images, runs):
+    latencies = []
+    top1 = []
+    for image_bytes in images:
+        for run in range(runs):
+            start = time.perf_counter()
+            prediction = predictor.predict(image_bytes, top_k=1)
+            latencies.append((time.perf_counter() - start) * 1000)
+        top1.append(prediction[0]['class'])
+    return top1, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a CPU inference variant of the skin disease model against stock fp32')
+    parser.add_argument('--variant', default='int8', choices=['optimized', 'int8'])
+    parser.add_argument('--images', required=True, help='directory of evaluation images; files in the INT8 calibration set are skipped')
+    parser.add_argument('--runs', type=int, default=3, help='timed predictions per image')
+    parser.add_argument('--output', default=None, help='write the report as JSON to this path')
+    args = parser.parse_args()
+
+    baseline = SkinDiseasePredictor(model_assets_path, variant='fp32')
+    candidate = SkinDiseasePredictor(model_assets_path, variant=args.variant)
+
+    image_dir = args.images
+    # agreement measured on the images INT8 was calibrated on would be optimistic
+    calibration = {os.path.realpath(path) for path in baseline.calibration_paths()}
+    paths = []
+    for pattern in ('*.jpg', '*.jpeg', '*.png', '*.webp'):
+        paths.extend(glob.glob(os.path.join(image_dir, pattern)))
+    excluded = [path for path in paths if os.path.realpath(path) in calibration]
+    paths = [path for path in paths if os.path.realpath(path) not in calibration]
+    if not paths:
+        print(f"No evaluation images outside the calibration set found in {image_dir}")
+        sys.exit(1)
+
+    images = []
+    for path in sorted(paths):
+        with open(path, 'rb') as f:
+            images.append(f.read())
+
+    baseline_top1, baseline_latencies = time_predictions(baseline, images, args.runs)
+    candidate_top1, candidate_latencies = time_predictions(candidate, images, args.runs)
+
+    agreement = sum(a == b for a, b in zip(baseline_top1, candidate_top1)) / len(images)
+    baseline_summary = latency_summary(baseline_latencies)
+    candidate_summary = latency_summary(candidate_latencies)
+
+    report = {
+        'images': len(images),
+        'image_dir': os.path.abspath(image_dir),
+        'excluded_calibration_images': len(excluded),
+        'variant': args.variant,
+        'top1_agreement': agreement,
+        'latency': {
+            'fp32': baseline_summary,
+            args.variant: candidate_summary
+        },
+        'speedup': baseline_summary['mean_ms'] / candidate_summary['mean_ms']
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
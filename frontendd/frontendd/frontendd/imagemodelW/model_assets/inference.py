@@ -6,10 +6,19 @@ from torchvision import models, transforms
 from PIL import Image
 import json
 import io
+import os
+import sys
+import glob
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import numpy as np
 
+# the frontend project root, which also holds the shared uploads the INT8 variant calibrates on
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(PROJECT_ROOT)
+from model_runtime.torch_graphs import load_weights, compiled_cache_path, build_graph
+from model_runtime import keyword_triage
+
 # the MedicalResponseSystem class 
 
 class MedicalResponseSystem:
@@ -55,14 +64,7 @@ class MedicalResponseSystem:
     
     def assess_emergency_symptoms(self, symptoms_text):
         """Your existing emergency assessment logic"""
-        emergency_flags = []
-        if symptoms_text:
-            symptoms_lower = symptoms_text.lower()
-            for indicator, message in self.emergency_indicators.items():
-                if indicator in symptoms_lower:
-                    emergency_flags.append(message)
-        
-        return emergency_flags
+        return keyword_triage.emergency_flags(symptoms_text, self.emergency_indicators)
     
     def generate_comprehensive_report(self, image_prediction, symptoms_text=None):
         """Your existing report generation logic"""
@@ -86,7 +88,7 @@ class MedicalResponseSystem:
 
 # the Skin Disease Predictor Class 
 class SkinDiseasePredictor:
-    def __init__(self, model_assets_path):
+    def __init__(self, model_assets_path, variant=None):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.model_assets_path = model_assets_path
         
@@ -94,6 +96,13 @@ class SkinDiseasePredictor:
         with open(f'{model_assets_path}/model_config.json', 'r') as f:
             self.config = json.load(f)
         
+        # cpu_variant: "fp32" (stock), "optimized" (folded BatchNorm, channels-last) or "int8" (static quantization)
+        self.variant = variant or self.config.get("cpu_variant", "fp32")
+        if self.variant == "int8":
+            # quantized kernels only run on CPU
+            self.device = torch.device('cpu')
+        self.memory_format = torch.channels_last if self.variant in ("optimized", "int8") else torch.contiguous_format
+        
         # loading class mappings
         with open(f'{model_assets_path}/class_to_idx.json', 'r') as f:
             self.class_to_idx = json.load(f)
@@ -111,15 +120,6 @@ class SkinDiseasePredictor:
             f'{model_assets_path}/emergency_indicators.json'
         )
         
-        # initializing model
-        self.model = self._create_model()
-        self.model.load_state_dict(
-            torch.load(f'{model_assets_path}/skin_disease_model.pth', 
-                      map_location=self.device)
-        )
-        self.model.to(self.device)
-        self.model.eval()
-        
         # image transforms
         self.transform = transforms.Compose([
             transforms.Resize(256),
@@ -130,6 +130,89 @@ class SkinDiseasePredictor:
                 std=self.config["normalization"]["std"]
             ),
         ])
+        
+        # loading (or graph-compiling) the model and warming it up so no request pays the first-call cost
+        self.compiled_model = self._compile_model()
+    
+    def _load_model(self, example):
+        model = self._create_model()
+        model.load_state_dict(load_weights(f'{self.model_assets_path}/skin_disease_model.pth', self.device))
+        model.to(self.device)
+        return self._apply_variant(model.eval(), example)
+    
+    def _fold_batchnorm(self, module):
+        # folding every eval-mode BatchNorm that directly follows a conv into the conv weights
+        children = list(module.named_children())
+        for (name, child), (next_name, next_child) in zip(children, children[1:]):
+            if isinstance(child, nn.Conv2d) and isinstance(next_child, nn.BatchNorm2d):
+                setattr(module, name, torch.nn.utils.fusion.fuse_conv_bn_eval(child, next_child))
+                setattr(module, next_name, nn.Identity())
+        for name, child in module.named_children():
+            self._fold_batchnorm(child)
+        return module
+    
+    def calibration_paths(self):
+        # calibration_dir is relative to the project root, so every deployed version under versions/ finds the same images
+        calibration_dir = os.path.join(PROJECT_ROOT, self.config.get("calibration_dir", "public/uploads/images"))
+        paths = []
+        for pattern in ('*.jpg', '*.jpeg', '*.png', '*.webp'):
+            paths.extend(glob.glob(os.path.join(calibration_dir, pattern)))
+        return sorted(paths)[:self.config.get("calibration_size", 64)]
+    
+    def _calibration_batches(self):
+        for path in self.calibration_paths():
+            image = Image.open(path).convert('RGB')
+            yield self.transform(image).unsqueeze(0).to(memory_format=self.memory_format)
+    
+    def _quantize(self, model, example):
+        # static post-training INT8 quantization, calibrated on the local image set
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+        
+        engines = torch.backends.quantized.supported_engines
+        backend = 'x86' if 'x86' in engines else 'fbgemm' if 'fbgemm' in engines else 'qnnpack'
+        torch.backends.quantized.engine = backend
+        
+        prepared = prepare_fx(model, get_default_qconfig_mapping(backend), example_inputs=(example,))
+        calibrated = 0
+        with torch.no_grad():
+            for batch in self._calibration_batches():
+                prepared(batch)
+                calibrated += 1
+        if calibrated == 0:
+            raise RuntimeError("no calibration images found")
+        
+        return convert_fx(prepared)
+    
+    def _apply_variant(self, model, example):
+        if self.variant == "fp32":
+            return model
+        
+        model = self._fold_batchnorm(model).to(memory_format=torch.channels_last)
+        if self.variant == "int8":
+            try:
+                model = self._quantize(model, example)
+            except Exception as e:
+                print(f"INT8 quantization unavailable, using optimized float32: {str(e)}")
+        return model
+    
+    def _compile_model(self):
+        # execution_mode in model_config.json; see model_runtime.torch_graphs.build_graph
+        mode = self.config.get("execution_mode", "eager")
+        size = self.config["input_size"]
+        example = torch.zeros(1, 3, size, size, device=self.device).to(memory_format=self.memory_format)
+        
+        # a cached graph already has the variant baked in, so the variant is only built when tracing afresh
+        cache_path = compiled_cache_path(self.model_assets_path, 'skin_disease_model.pth', self.device, self.variant)
+        compiled = build_graph(mode, cache_path, lambda: self._load_model(example), example, self.device)
+        
+        # warm-up passes over the batch sizes requests commonly use
+        with torch.no_grad():
+            for batch_size in self.config.get("warmup_batch_sizes", [1]):
+                for _ in range(self.config.get("warmup_iterations", 2)):
+                    compiled(example.expand(batch_size, -1, -1, -1).contiguous(memory_format=self.memory_format))
+        
+        return compiled
     
     def _create_model(self):
         class RegularizedEfficientNet(nn.Module):
@@ -147,22 +230,29 @@ class SkinDiseasePredictor:
                 
         return RegularizedEfficientNet(self.config["num_classes"])
     
-    def predict(self, image_bytes, top_k=3):
-        # predicting diseases from image
-        try:
-            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-            input_tensor = self.transform(image).unsqueeze(0).to(self.device)
-            
-            with torch.no_grad():
-                output = self.model(input_tensor)
-                probabilities = F.softmax(output, dim=1)
-                top_probs, top_indices = torch.topk(probabilities, top_k)
-            
-            top_probs = top_probs.cpu().numpy()[0]
-            top_indices = top_indices.cpu().numpy()[0]
-            
+    def preprocess(self, image_bytes):
+        # decoding and transforming one image into a CHW tensor; an HWC uint8 RGB array is already decoded
+        if isinstance(image_bytes, np.ndarray):
+            return self.transform(Image.fromarray(image_bytes))
+        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        return self.transform(image)
+    
+    def predict_tensors(self, batch, top_k=3):
+        # predicting diseases for an NCHW batch of preprocessed images in one forward pass
+        input_tensor = batch.to(self.device, memory_format=self.memory_format)
+        
+        with torch.no_grad():
+            output = self.compiled_model(input_tensor)
+            probabilities = F.softmax(output, dim=1)
+            top_probs, top_indices = torch.topk(probabilities, top_k)
+        
+        top_probs = top_probs.cpu().numpy()
+        top_indices = top_indices.cpu().numpy()
+        
+        batch_predictions = []
+        for row in range(len(top_probs)):
             predictions = []
-            for i, (idx, prob) in enumerate(zip(top_indices, top_probs)):
+            for i, (idx, prob) in enumerate(zip(top_indices[row], top_probs[row])):
                 class_name = self.idx_to_class[str(idx)]
                 predictions.append({
                     'rank': i + 1,
@@ -170,20 +260,44 @@ class SkinDiseasePredictor:
                     'confidence': float(prob),
                     'class_index': int(idx)
                 })
-            
-            return predictions
-            
-        except Exception as e:
-            return [{
+            batch_predictions.append(predictions)
+        
+        return batch_predictions
+    
+    def predict(self, image_bytes, top_k=3):
+        # predicting diseases from image
+        return self.predict_batch([image_bytes], top_k)[0]
+    
+    def predict_batch(self, images_bytes, top_k=3):
+        # decoding each image, then scoring every decodable one in a single forward pass
+        tensors = {}
+        errors = {}
+        for i, image_bytes in enumerate(images_bytes):
+            try:
+                tensors[i] = self.preprocess(image_bytes)
+            except Exception as e:
+                errors[i] = str(e)
+        
+        results = [None] * len(images_bytes)
+        if tensors:
+            try:
+                batch_predictions = self.predict_tensors(torch.stack(list(tensors.values())), top_k)
+                for i, predictions in zip(tensors.keys(), batch_predictions):
+                    results[i] = predictions
+            except Exception as e:
+                errors.update({i: str(e) for i in tensors})
+        
+        for i, error in errors.items():
+            results[i] = [{
                 'rank': 1,
                 'class': 'prediction_error',
                 'confidence': 0.0,
-                'error': str(e)
+                'error': error
             }]
-    
-    def predict_with_treatment(self, image_bytes, symptoms_text=None):
-        image_pred = self.predict(image_bytes)
         
+        return results
+    
+    def report_from_predictions(self, image_pred, symptoms_text=None):
         # checking if prediction failed
         if image_pred and 'error' in image_pred[0]:
             return {
@@ -193,8 +307,19 @@ class SkinDiseasePredictor:
             }
         
         # generating report
-        report = self.medical_system.generate_comprehensive_report(image_pred, symptoms_text)
-        return report
+        return self.medical_system.generate_comprehensive_report(image_pred, symptoms_text)
+    
+    def assess_emergency_symptoms(self, symptoms_text):
+        # emergency keyword messages for the symptom description alone, without an image
+        return self.medical_system.assess_emergency_symptoms(symptoms_text)
+    
+    def predict_with_treatment(self, image_bytes, symptoms_text=None):
+        image_pred = self.predict(image_bytes)
+        return self.report_from_predictions(image_pred, symptoms_text)
+    
+    def predict_batch_with_treatment(self, images, symptoms_text=None):
+        # one report per image (encoded bytes or decoded RGB arrays), all scored in a single forward pass
+        return [self.report_from_predictions(image_pred, symptoms_text) for image_pred in self.predict_batch(images)]
 
 # flask app
 app = Flask(__name__)
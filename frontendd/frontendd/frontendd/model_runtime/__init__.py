@@ -0,0 +1 @@
+# helpers shared by the model packages (textmodelW, imagemodelW, audiomodelW) and the AI service
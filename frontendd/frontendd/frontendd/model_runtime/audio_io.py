@@ -0,0 +1,44 @@
+# audio decoding shared by DogAudioClassifier and the split-mode front process (model_workers.py).
+# only numpy, soundfile and soxr, so uploads can be decoded without importing TensorFlow
+import numpy as np
+import soundfile as sf
+
+# resample_quality trades speed for fidelity: "fast", "balanced" or "high" (librosa's default quality)
+RESAMPLE_QUALITIES = {'fast': 'soxr_qq', 'balanced': 'soxr_mq', 'high': 'soxr_hq'}
+
+def resample_type(quality):
+    return RESAMPLE_QUALITIES.get(quality, quality)
+
+def decode_window(source, duration):
+    # seeking and decoding only the first `duration` seconds at the native rate; None if soundfile can't read it
+    position = source.tell() if hasattr(source, 'read') else None
+    try:
+        with sf.SoundFile(source) as f:
+            native_sr = f.samplerate
+            audio = f.read(frames=int(np.ceil(duration * native_sr)), dtype='float32', always_2d=True)
+    except RuntimeError:
+        if position is not None:
+            source.seek(position)
+        return None
+
+    # downmixing to mono
+    return audio.mean(axis=1), native_sr
+
+def resample(audio, orig_sr, target_sr, res_type):
+    if orig_sr == target_sr:
+        return audio
+    if res_type.startswith('soxr'):
+        try:
+            import soxr
+        except ImportError:
+            soxr = None
+        if soxr is not None:
+            # the same call librosa makes for its soxr_* resamplers
+            return np.ascontiguousarray(soxr.resample(audio, orig_sr, target_sr, quality=res_type), dtype=np.float32)
+
+    import librosa
+    try:
+        return librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr, res_type=res_type)
+    except Exception:
+        # older librosa without soxr support
+        return librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr, res_type='polyphase')
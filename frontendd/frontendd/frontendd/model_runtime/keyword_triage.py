@@ -0,0 +1,72 @@
+# keyword-only severity and emergency checks on a symptom description. The text and image models score
+# with these, and the AI service runs them on their own for triage, so they never need model weights
+import os
+import re
+import json
+
+CRITICAL_INDICATORS = [
+    'unconscious', 'seizure', 'paralysis', 'collapse',
+    'pale gums', 'bloat', 'distended abdomen', 'difficulty breathing'
+]
+SEVERE_INDICATORS = [
+    'bleeding', 'vomiting blood', 'bloody diarrhea', 'unable to stand',
+    'crying in pain', 'swollen abdomen', 'high fever'
+]
+MODERATE_INDICATORS = [
+    'vomiting', 'diarrhea', 'lethargy', 'pain', 'limp', 'not eating',
+    'fever', 'coughing', 'whining', 'difficulty urinating'
+]
+
+def clinical_text(symptom_text, breed=None, age=None, sex=None):
+    text = symptom_text
+    if breed:
+        text += f" Breed: {breed}"
+    if age:
+        text += f" Age: {age} years"
+    if sex:
+        text += f" Sex: {sex}"
+    return text
+
+def symptom_severity(symptoms_text, severity_levels):
+    symptom_text_lower = symptoms_text.lower()
+    severity_score = 1
+
+    for level, indicators in (('critical', CRITICAL_INDICATORS), ('severe', SEVERE_INDICATORS), ('moderate', MODERATE_INDICATORS)):
+        for indicator in indicators:
+            if re.search(r'\b' + re.escape(indicator) + r'\b', symptom_text_lower):
+                severity_score = max(severity_score, severity_levels[level])
+
+    return severity_score
+
+def severity(clinical_text, severity_levels):
+    severity_score = symptom_severity(clinical_text, severity_levels)
+    score_to_level = {v: k for k, v in severity_levels.items()}
+    return {
+        'score': severity_score,
+        'level': score_to_level.get(severity_score, "unknown"),
+        'urgent_care': severity_score >= severity_levels['severe']
+    }
+
+def emergency_flags(symptoms_text, emergency_indicators):
+    flags = []
+    if symptoms_text:
+        symptoms_lower = symptoms_text.lower()
+        for indicator, message in emergency_indicators.items():
+            if indicator in symptoms_lower:
+                flags.append(message)
+    return flags
+
+class KeywordTriage:
+    # the keyword tables of one text model version (severity_levels.json) and one image model version
+    # (emergency_indicators.json)
+    def __init__(self, text_assets_path, image_assets_path):
+        with open(os.path.join(text_assets_path, 'severity_levels.json'), 'r') as f:
+            self.severity_levels = json.load(f)
+        with open(os.path.join(image_assets_path, 'emergency_indicators.json'), 'r') as f:
+            self.emergency_indicators = json.load(f)
+
+    def assess_severity(self, symptom_text, breed=None, age=None, sex=None):
+        return severity(clinical_text(symptom_text, breed, age, sex), self.severity_levels)
+
+    def assess_emergency_symptoms(self, symptoms_text):
+        return emergency_flags(symptoms_text, self.emergency_indicators)
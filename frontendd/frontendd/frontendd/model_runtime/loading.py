@@ -0,0 +1,29 @@
+import os
+import sys
+import importlib.util
+
+# the three model packages each ship an inference.py with their own sibling imports, so each is loaded under
+# a distinct module name with its directory briefly first on sys.path
+INFERENCE_CLASSES = {
+    'text': (os.path.join('textmodelW', 'model_assets'), 'text_inference', 'DogDiseaseClassifier'),
+    'audio': (os.path.join('audiomodelW', 'audio_model_assets'), 'audio_inference', 'DogAudioClassifier'),
+    'image': (os.path.join('imagemodelW', 'model_assets'), 'image_inference', 'SkinDiseasePredictor')
+}
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def model_assets_path(kind):
+    return os.path.join(PROJECT_ROOT, INFERENCE_CLASSES[kind][0])
+
+def load_inference_class(model_path, module_name, class_name):
+    sys.path.insert(0, model_path)
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(model_path, "inference.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return getattr(module, class_name)
+    finally:
+        sys.path.pop(0)
+
+def load_model_class(kind, model_path=None):
+    _, module_name, class_name = INFERENCE_CLASSES[kind]
+    return load_inference_class(model_path or model_assets_path(kind), module_name, class_name)
@@ -0,0 +1,41 @@
+import os
+import hashlib
+import torch
+
+def load_weights(path, device):
+    # memory-mapping the checkpoint keeps reloads after an eviction cheap where torch supports it
+    try:
+        return torch.load(path, map_location=device, mmap=True)
+    except (TypeError, RuntimeError):
+        return torch.load(path, map_location=device)
+
+def compiled_cache_path(model_assets_path, weights_name, device, *key_parts):
+    # cache entries are keyed by the weights file and torch version so stale graphs are never reused
+    stat = os.stat(os.path.join(model_assets_path, weights_name))
+    parts = (stat.st_mtime_ns, stat.st_size, torch.__version__, device.type) + key_parts
+    key = hashlib.sha1('-'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+    return os.path.join(model_assets_path, 'compiled', f'{os.path.splitext(weights_name)[0]}-{key}.pt')
+
+def build_graph(mode, cache_path, build_eager, example, device, **trace_kwargs):
+    # execution_mode: "eager", "torchscript" (traced, frozen, cached on disk) or "compile".
+    # a cached graph is loaded without ever constructing the eager model, and a freshly traced one
+    # replaces it, since freezing copies the weights into the graph
+    if mode == "torchscript" and os.path.exists(cache_path):
+        try:
+            return torch.jit.load(cache_path, map_location=device)
+        except Exception as e:
+            print(f"Cached TorchScript graph unusable, rebuilding: {str(e)}")
+    
+    model = build_eager()
+    if mode == "torchscript":
+        try:
+            with torch.no_grad():
+                graph = torch.jit.freeze(torch.jit.trace(model, example, **trace_kwargs))
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            torch.jit.save(graph, cache_path)
+            return graph
+        except Exception as e:
+            print(f"TorchScript compilation failed, running eagerly: {str(e)}")
+    elif mode == "compile" and hasattr(torch, "compile"):
+        return torch.compile(model)
+    return model
@@ -1,42 +1,26 @@
 // AI Model Integration Routes
 const express = require('express');
 const router = express.Router();
-const multer = require('multer');
-const FormData = require('form-data');
-const axios = require('axios');
-const fs = require('fs');
-const path = require('path');
-
-const upload = multer({ 
-  dest: 'public/uploads/',
-  limits: {
-    fileSize: 10 * 1024 * 1024 // 10MB limit
-  },
-  fileFilter: (req, file, cb) => {
-    if (file.mimetype.startsWith('image/') || 
-        file.mimetype.startsWith('audio/')) {
-      cb(null, true);
-    } else {
-      cb(new Error('Only image and audio files are allowed'), false);
-    }
-  }
-});
-
-// Flask AI service URL
-const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:5002';
+const { aiClient, forwardMultipart, getAvailability, refreshAvailability, markUnavailable } = require('../utils/aiClient');
+const { requireAuth } = require('../middleware/security');
+const Dog = require('../models/dog');
 
 router.get('/health', async (req, res) => {
-  try {
-    const response = await axios.get(`${AI_SERVICE_URL}/health`);
+  // Served from the background-refreshed cache unless a fresh probe is requested
+  const status = req.query.refresh === 'true' ? await refreshAvailability() : getAvailability();
+
+  if (status.available) {
     res.json({
       status: 'connected',
-      ai_service: response.data
+      ai_service: status.details,
+      checkedAt: status.checkedAt
     });
-  } catch (error) {
+  } else {
     res.status(503).json({
       status: 'disconnected',
       error: 'AI service unavailable',
-      message: error.message
+      message: status.error,
+      checkedAt: status.checkedAt
     });
   }
 });
@@ -52,7 +36,7 @@ router.post('/analyze/text', async (req, res) => {
       });
     }
 
-    const response = await axios.post(`${AI_SERVICE_URL}/analyze/text`, {
+    const response = await aiClient.post('/analyze/text', {
       symptom_text,
       breed,
       age: age ? parseInt(age) : undefined,
@@ -62,6 +46,7 @@ router.post('/analyze/text', async (req, res) => {
     res.json(response.data);
   } catch (error) {
     console.error('Text analysis error:', error.message);
+    markUnavailable(error);
     res.status(500).json({
       error: 'Text analysis failed',
       message: error.message
@@ -70,42 +55,16 @@ router.post('/analyze/text', async (req, res) => {
 });
 
 // Analyze audio file
-router.post('/analyze/audio', upload.single('audio'), async (req, res) => {
+router.post('/analyze/audio', async (req, res) => {
   try {
-    if (!req.file) {
-      return res.status(400).json({
-        error: 'No audio file provided'
-      });
-    }
-
-    const FormData = require('form-data');
-    const fs = require('fs');
-    
-    const formData = new FormData();
-    formData.append('audio', fs.createReadStream(req.file.path));
-
-    const response = await axios.post(`${AI_SERVICE_URL}/analyze/audio`, formData, {
-      headers: {
-        ...formData.getHeaders(),
-      },
-    });
-
-    // Clean up uploaded file
-    fs.unlink(req.file.path, (err) => {
-      if (err) console.error('Error deleting temp file:', err);
-    });
-
+    // The multipart body is piped straight through, so the audio is never spooled here
+    const { response } = await forwardMultipart(req, '/analyze/audio');
     res.json(response.data);
   } catch (error) {
     console.error('Audio analysis error:', error.message);
+    markUnavailable(error);
     
-    if (req.file) {
-      fs.unlink(req.file.path, (err) => {
-        if (err) console.error('Error deleting temp file:', err);
-      });
-    }
-    
-    res.status(500).json({
+    res.status(error.status || 500).json({
       error: 'Audio analysis failed',
       message: error.message
     });
@@ -113,134 +72,99 @@ router.post('/analyze/audio', upload.single('audio'), async (req, res) => {
 });
 
 // Analyze image file
-router.post('/analyze/image', upload.single('image'), async (req, res) => {
+router.post('/analyze/image', async (req, res) => {
   try {
-    if (!req.file) {
-      return res.status(400).json({
-        error: 'No image file provided'
-      });
-    }
-
-    const FormData = require('form-data');
-    const fs = require('fs');
-    
-    const formData = new FormData();
-    formData.append('image', fs.createReadStream(req.file.path));
-    formData.append('symptoms', req.body.symptoms || '');
-
-    const response = await axios.post(`${AI_SERVICE_URL}/analyze/image`, formData, {
-      headers: {
-        ...formData.getHeaders(),
-      },
-    });
-
-    // Clean up uploaded file
-    fs.unlink(req.file.path, (err) => {
-      if (err) console.error('Error deleting temp file:', err);
-    });
-
+    const { response } = await forwardMultipart(req, '/analyze/image');
     res.json(response.data);
   } catch (error) {
     console.error('Image analysis error:', error.message);
+    markUnavailable(error);
     
-    // Clean up uploaded file on error
-    if (req.file) {
-      fs.unlink(req.file.path, (err) => {
-        if (err) console.error('Error deleting temp file:', err);
-      });
-    }
-    
-    res.status(500).json({
+    res.status(error.status || 500).json({
       error: 'Image analysis failed',
       message: error.message
     });
   }
 });
 
+const STREAM_FORMATS = {
+  sse: 'text/event-stream',
+  ndjson: 'application/x-ndjson'
+};
+
+// ?stream=sse|ndjson, or an Accept header asking for one of them
+const streamFormat = (req) => {
+  if (STREAM_FORMATS[req.query.stream]) return req.query.stream;
+  const accepted = req.accepts(['application/json', ...Object.values(STREAM_FORMATS)]);
+  return Object.keys(STREAM_FORMATS).find(format => STREAM_FORMATS[format] === accepted) || null;
+};
+
 // Comprehensive multimodal analysis
-router.post('/analyze/comprehensive', upload.fields([
-  { name: 'image', maxCount: 1 },
-  { name: 'audio', maxCount: 1 }
-]), async (req, res) => {
+router.post('/analyze/comprehensive', async (req, res) => {
   try {
-    const FormData = require('form-data');
-    const fs = require('fs');
-    
-    const formData = new FormData();
-    
-    // Add text data
-    if (req.body.symptom_text) {
-      formData.append('symptom_text', req.body.symptom_text);
-    }
-    if (req.body.breed) {
-      formData.append('breed', req.body.breed);
-    }
-    if (req.body.age) {
-      formData.append('age', req.body.age);
-    }
-    if (req.body.sex) {
-      formData.append('sex', req.body.sex);
-    }
-    
-    if (req.files && req.files.image) {
-      formData.append('image', fs.createReadStream(req.files.image[0].path));
-    }
-    
-    if (req.files && req.files.audio) {
-      formData.append('audio', fs.createReadStream(req.files.audio[0].path));
-    }
+    const format = streamFormat(req);
 
-    const response = await axios.post(`${AI_SERVICE_URL}/analyze/comprehensive`, formData, {
-      headers: {
-        ...formData.getHeaders(),
-      },
-    });
+    if (format) {
+      // Triage, per-modality results and the final report are relayed event by event as the AI service emits them
+      const { response } = await forwardMultipart(req, '/analyze/comprehensive', {
+        params: { stream: format },
+        responseType: 'stream'
+      });
 
-    if (req.files) {
-      const filesToDelete = [];
-      if (req.files.image) filesToDelete.push(req.files.image[0].path);
-      if (req.files.audio) filesToDelete.push(req.files.audio[0].path);
-      
-      filesToDelete.forEach(filePath => {
-        fs.unlink(filePath, (err) => {
-          if (err) console.error('Error deleting temp file:', err);
-        });
+      res.status(response.status);
+      res.set({
+        'Content-Type': STREAM_FORMATS[format],
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
       });
+      res.flushHeaders();
+
+      response.data.pipe(res);
+      res.on('close', () => response.data.destroy());
+      return;
     }
 
+    const { response } = await forwardMultipart(req, '/analyze/comprehensive');
     res.json(response.data);
   } catch (error) {
     console.error('Comprehensive analysis error:', error.message);
+    markUnavailable(error);
     
-    if (req.files) {
-      const filesToDelete = [];
-      if (req.files.image) filesToDelete.push(req.files.image[0].path);
-      if (req.files.audio) filesToDelete.push(req.files.audio[0].path);
-      
-      filesToDelete.forEach(filePath => {
-        fs.unlink(filePath, (err) => {
-          if (err) console.error('Error deleting temp file:', err);
-        });
-      });
-    }
-    
-    res.status(500).json({
+    res.status(error.status || 500).json({
       error: 'Comprehensive analysis failed',
       message: error.message
     });
   }
 });
 
-router.get('/history/:dogId', async (req, res) => {
+// Past analyses for a dog, newest first, with its running trend aggregates
+router.get('/history/:dogId', requireAuth, async (req, res) => {
   try {
     const { dogId } = req.params;
-    
+    const { limit, before, results } = req.query;
+
+    const dog = await Dog.findOne({
+      _id: dogId,
+      owner: req.session.user._id
+    });
+
+    if (!dog) {
+      return res.status(404).json({ error: 'Dog not found or access denied' });
+    }
+
+    const response = await aiClient.get(`/history/${encodeURIComponent(dogId)}`, {
+      params: { limit, before, results }
+    });
+
     res.json({
       dogId,
-      analyses: [],
-      message: 'Analysis history feature coming soon'
+      total: response.data.total,
+      analyses: response.data.analyses,
+      trends: response.data.trends
     });
   } catch (error) {
+    console.error('Analysis history error:', error.message);
+    markUnavailable(error);
     res.status(500).json({
       error: 'Failed to fetch analysis history',
       message: error.message
@@ -6,12 +6,19 @@ const Dog = require('../models/dog');
 const fs = require('fs');
 const path = require('path');
 const FormData = require('form-data');
-const axios = require('axios');
+const { aiClient, isAvailable, markUnavailable } = require('../utils/aiClient');
 
 const router = express.Router();
 
 const { requireAuth } = require('../middleware/security');
 
+// A modality's entry in a comprehensive response, in the shape its own /analyze/<type> endpoint returns
+const modalityResult = (result, failure) => {
+    if (!result) return null;
+    if (result.status === 'error') return { error: failure, details: result.error };
+    return result;
+};
+
 // Submit health analysis request
 router.post('/analyze', requireAuth, upload.fields([
     { name: 'images', maxCount: 5 },
@@ -96,175 +103,110 @@ router.post('/analyze', requireAuth, upload.fields([
                 healthLog.aiAnalysis.status = 'processing';
                 await healthLog.save();
                 
-                // Check if AI service is available first
-                let aiServiceAvailable = false;
-                try {
-                    const controller = new AbortController();
-                    const timeoutId = setTimeout(() => controller.abort(), 5000);
-                    
-                    const healthCheck = await fetch('http://localhost:5002/health', { 
-                        method: 'GET',
-                        signal: controller.signal
-                    });
-                    
-                    clearTimeout(timeoutId);
-                    aiServiceAvailable = healthCheck.ok;
-                    console.log('AI service health check:', healthCheck.ok ? 'Available' : 'Not available');
-                } catch (error) {
-                    console.log('AI service not available, proceeding with basic analysis:', error.message);
-                    aiServiceAvailable = false;
-                }
+                // Use the cached AI service status instead of probing before every analysis
+                const aiServiceAvailable = await isAvailable();
+                console.log('AI service status:', aiServiceAvailable ? 'Available' : 'Not available');
                 
-                // Call AI service for text analysis
+                // One comprehensive request covers every modality of this health log, so the AI service
+                // records it in the dog's history as a single analysis
                 let textAnalysis = null;
-                if (symptoms && aiServiceAvailable) {
-                    try {
-                        console.log('Calling AI service for text analysis...');
-                        const textResponse = await fetch('http://localhost:5002/analyze/text', {
-                            method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
-                            body: JSON.stringify({ 
-                                symptom_text: symptoms,
-                                breed: breed,
-                                age: age,
-                                sex: sex
-                            })
-                        });
-                        
-                        if (!textResponse.ok) {
-                            const errorText = await textResponse.text();
-                            console.error('AI text analysis failed:', textResponse.status, textResponse.statusText, errorText);
-                            textAnalysis = { error: 'Text analysis failed', details: errorText };
-                        } else {
-                            textAnalysis = await textResponse.json();
-                            console.log('Text analysis response:', JSON.stringify(textAnalysis, null, 2));
-                        }
-                    } catch (error) {
-                        console.error('Error in text analysis:', error);
-                        textAnalysis = { error: 'Text analysis failed', details: error.message };
-                    }
-                } else if (symptoms && !aiServiceAvailable) {
-                    textAnalysis = {
-                        data: {
-                            predictions: [{
-                                disease: 'General Health Assessment',
-                                confidence: 0.5,
-                                treatments: ['Monitor symptoms closely', 'Consult veterinarian if symptoms persist', 'Keep detailed symptom log'],
-                                severity: 1
-                            }],
-                            urgent_care: false,
-                            severity: { level: 'low', score: 1 }
-                        }
-                    };
-                    console.log('Using basic analysis - AI service not available');
+                let imageAnalysis = null;
+                let audioAnalysis = null;
+                
+                const imageFiles = processedFiles.images.filter(file => fs.existsSync(file.path));
+                if (processedFiles.images.length > 0 && imageFiles.length === 0) {
+                    console.error('Image files do not exist:', processedFiles.images.map(file => file.path));
+                    imageAnalysis = { error: 'Image file not found' };
+                }
+                const audioFiles = processedFiles.audio.filter(file => fs.existsSync(file.path));
+                if (processedFiles.audio.length > 0 && audioFiles.length === 0) {
+                    console.error('Audio files do not exist:', processedFiles.audio.map(file => file.path));
+                    audioAnalysis = { error: 'Audio file not found' };
                 }
                 
-                // Call AI service for image analysis
-                let imageAnalysis = null;
-                if (processedFiles.images && processedFiles.images.length > 0 && aiServiceAvailable) {
+                if (aiServiceAvailable && (symptoms || imageFiles.length > 0 || audioFiles.length > 0)) {
                     try {
-                        console.log('Processing image file:', processedFiles.images[0]);
-                        
-                        // Check if file exists
-                        if (!fs.existsSync(processedFiles.images[0].path)) {
-                            console.error('Image file does not exist:', processedFiles.images[0].path);
-                            imageAnalysis = { error: 'Image file not found' };
-                        } else {
-                            // Read the image file as buffer
-                            const imageBuffer = fs.readFileSync(processedFiles.images[0].path);
-                            
-                            const imageFormData = new FormData();
-                            imageFormData.append('image', imageBuffer, {
-                                filename: processedFiles.images[0].originalName || 'image.jpg',
-                                contentType: 'image/jpeg'
+                        // Stream the stored files instead of buffering them in memory
+                        const formData = new FormData();
+                        if (symptoms) formData.append('symptom_text', symptoms);
+                        if (breed) formData.append('breed', breed);
+                        if (age) formData.append('age', String(age));
+                        if (sex) formData.append('sex', sex);
+                        // Lets the AI service reuse results for near-identical photos of this dog and record the analysis in its history
+                        formData.append('dog_id', String(dogId));
+                        imageFiles.forEach(file => {
+                            formData.append('image', fs.createReadStream(file.path), {
+                                filename: file.originalName || 'image.jpg',
+                                contentType: 'image/jpeg',
+                                knownLength: file.size
                             });
-                            if (symptoms) imageFormData.append('symptoms', symptoms);
-                            
-                            console.log('Sending image to AI service...');
-                            const imageResponse = await axios.post('http://localhost:5002/analyze/image', imageFormData, {
-                                headers: {
-                                    ...imageFormData.getHeaders()
-                                }
+                        });
+                        audioFiles.forEach(file => {
+                            formData.append('audio', fs.createReadStream(file.path), {
+                                filename: file.originalName || 'audio.wav',
+                                contentType: 'audio/wav',
+                                knownLength: file.size
                             });
-                            
-                            if (imageResponse.status !== 200) {
-                                console.error('AI image analysis failed:', imageResponse.status, imageResponse.statusText, imageResponse.data);
-                                imageAnalysis = { error: 'Image analysis failed', details: imageResponse.data };
-                            } else {
-                                imageAnalysis = imageResponse.data;
-                                console.log('Image analysis response:', JSON.stringify(imageAnalysis, null, 2));
+                        });
+                        
+                        console.log('Sending health log to AI service...');
+                        const response = await aiClient.post('/analyze/comprehensive', formData, {
+                            headers: {
+                                ...formData.getHeaders()
                             }
-                        }
+                        });
+                        console.log('Comprehensive analysis response:', JSON.stringify(response.data, null, 2));
+                        
+                        const individual = response.data.individual_results || {};
+                        textAnalysis = modalityResult(individual.text_analysis, 'Text analysis failed');
+                        imageAnalysis = modalityResult(individual.image_analysis, 'Image analysis failed') || imageAnalysis;
+                        audioAnalysis = modalityResult(individual.audio_analysis, 'Audio analysis failed') || audioAnalysis;
                     } catch (error) {
-                        console.error('Error in image analysis:', error);
-                        imageAnalysis = { error: 'Image analysis failed', details: error.message };
+                        markUnavailable(error);
+                        const details = error.response ? JSON.stringify(error.response.data) : error.message;
+                        console.error('AI analysis failed:', details);
+                        if (symptoms) textAnalysis = { error: 'Text analysis failed', details };
+                        if (imageFiles.length > 0) imageAnalysis = { error: 'Image analysis failed', details };
+                        if (audioFiles.length > 0) audioAnalysis = { error: 'Audio analysis failed', details };
                     }
-                } else if (processedFiles.images && processedFiles.images.length > 0 && !aiServiceAvailable) {
-                    imageAnalysis = {
-                        data: {
-                            medical_advice: {
-                                diagnosis: 'Image Analysis Unavailable',
-                                confidence: 0.3,
-                                treatments: ['AI service not available', 'Please consult a veterinarian for image analysis'],
-                                is_emergency: false
+                } else if (!aiServiceAvailable) {
+                    if (symptoms) {
+                        textAnalysis = {
+                            data: {
+                                predictions: [{
+                                    disease: 'General Health Assessment',
+                                    confidence: 0.5,
+                                    treatments: ['Monitor symptoms closely', 'Consult veterinarian if symptoms persist', 'Keep detailed symptom log'],
+                                    severity: 1
+                                }],
+                                urgent_care: false,
+                                severity: { level: 'low', score: 1 }
                             }
-                        }
-                    };
-                    console.log('Using basic image analysis - AI service not available');
-                } else {
-                    console.log('No image files to process');
-                }
-                
-                // Call AI service for audio analysis
-                let audioAnalysis = null;
-                if (processedFiles.audio && processedFiles.audio.length > 0 && aiServiceAvailable) {
-                    try {
-                        console.log('Processing audio file:', processedFiles.audio[0]);
-                        
-                        if (!fs.existsSync(processedFiles.audio[0].path)) {
-                            console.error('Audio file does not exist:', processedFiles.audio[0].path);
-                            audioAnalysis = { error: 'Audio file not found' };
-                        } else {
-                            // Read the audio file as buffer
-                            const audioBuffer = fs.readFileSync(processedFiles.audio[0].path);
-                            
-                            const audioFormData = new FormData();
-                            audioFormData.append('audio', audioBuffer, {
-                                filename: processedFiles.audio[0].originalName || 'audio.wav',
-                                contentType: 'audio/wav'
-                            });
-                            
-                            console.log('Sending audio to AI service...');
-                            const audioResponse = await axios.post('http://localhost:5002/analyze/audio', audioFormData, {
-                                headers: {
-                                    ...audioFormData.getHeaders()
+                        };
+                    }
+                    if (processedFiles.images.length > 0) {
+                        imageAnalysis = {
+                            data: {
+                                medical_advice: {
+                                    diagnosis: 'Image Analysis Unavailable',
+                                    confidence: 0.3,
+                                    treatments: ['AI service not available', 'Please consult a veterinarian for image analysis'],
+                                    is_emergency: false
                                 }
-                            });
-                            
-                            if (audioResponse.status !== 200) {
-                                console.error('AI audio analysis failed:', audioResponse.status, audioResponse.statusText, audioResponse.data);
-                                audioAnalysis = { error: 'Audio analysis failed', details: audioResponse.data };
-                            } else {
-                                audioAnalysis = audioResponse.data;
-                                console.log('Audio analysis response:', JSON.stringify(audioAnalysis, null, 2));
                             }
-                        }
-                    } catch (error) {
-                        console.error('Error in audio analysis:', error);
-                        audioAnalysis = { error: 'Audio analysis failed', details: error.message };
+                        };
                     }
-                } else if (processedFiles.audio && processedFiles.audio.length > 0 && !aiServiceAvailable) {
-                    audioAnalysis = {
-                        data: {
-                            predictions: [{
-                                disease: 'Audio Analysis Unavailable',
-                                confidence: 0.3
-                            }]
-                        }
-                    };
-                    console.log('Using basic audio analysis - AI service not available');
-                } else {
-                    console.log('No audio files to process');
+                    if (processedFiles.audio.length > 0) {
+                        audioAnalysis = {
+                            data: {
+                                predictions: [{
+                                    disease: 'Audio Analysis Unavailable',
+                                    confidence: 0.3
+                                }]
+                            }
+                        };
+                    }
+                    console.log('Using basic analysis - AI service not available');
                 }
                 
                 // Process and combine results 
@@ -314,35 +256,42 @@ router.post('/analyze', requireAuth, upload.fields([
                 
                 // Process image analysis results
                 if (imageAnalysis && !imageAnalysis.error && imageAnalysis.data) {
-                    const imageData = imageAnalysis.data;
-                    if (imageData.medical_advice) {
-                        const medicalAdvice = imageData.medical_advice;
-                        if (medicalAdvice.diagnosis && medicalAdvice.confidence > confidence) {
-                            primaryDiagnosis = medicalAdvice.diagnosis;
-                            confidence = medicalAdvice.confidence;
-                        }
-                        
-                        if (medicalAdvice.treatments) {
-                            recommendations.push(...medicalAdvice.treatments);
-                        }
-                        
-                        if (medicalAdvice.is_emergency) {
-                            urgency = 'high';
+                    // A batched response lists every image under `files`; a single image only has `data`
+                    const imageFiles = imageAnalysis.files || [imageAnalysis.data];
+                    imageFiles.forEach((imageData, index) => {
+                        if (imageData.medical_advice) {
+                            const medicalAdvice = imageData.medical_advice;
+                            if (medicalAdvice.diagnosis && medicalAdvice.confidence > confidence) {
+                                primaryDiagnosis = medicalAdvice.diagnosis;
+                                confidence = medicalAdvice.confidence;
+                            }
+                            
+                            if (medicalAdvice.treatments) {
+                                recommendations.push(...medicalAdvice.treatments);
+                            }
+                            
+                            if (medicalAdvice.is_emergency) {
+                                urgency = 'high';
+                            }
+                            
+                            const label = imageFiles.length > 1 ? `Image ${index + 1} analysis` : 'Image analysis';
+                            suggestedActions.push(`${label}: ${medicalAdvice.diagnosis} (${(medicalAdvice.confidence * 100).toFixed(1)}% confidence)`);
                         }
-                        
-                        suggestedActions.push(`Image analysis: ${medicalAdvice.diagnosis} (${(medicalAdvice.confidence * 100).toFixed(1)}% confidence)`);
-                    }
+                    });
                 } else if (imageAnalysis && imageAnalysis.error) {
                     suggestedActions.push(`Image analysis failed: ${imageAnalysis.details}`);
                 }
                 
                 // Process audio analysis results
                 if (audioAnalysis && !audioAnalysis.error && audioAnalysis.data) {
-                    const audioData = audioAnalysis.data;
-                    if (audioData.predictions && audioData.predictions.length > 0) {
-                        const topAudio = audioData.predictions[0];
-                        suggestedActions.push(`Audio analysis: ${topAudio.disease} (${(topAudio.confidence * 100).toFixed(1)}% confidence)`);
-                    }
+                    const audioFiles = audioAnalysis.files || [audioAnalysis.data];
+                    audioFiles.forEach((audioData, index) => {
+                        if (audioData.predictions && audioData.predictions.length > 0) {
+                            const topAudio = audioData.predictions[0];
+                            const label = audioFiles.length > 1 ? `Audio ${index + 1} analysis` : 'Audio analysis';
+                            suggestedActions.push(`${label}: ${topAudio.disease} (${(topAudio.confidence * 100).toFixed(1)}% confidence)`);
+                        }
+                    });
                 } else if (audioAnalysis && audioAnalysis.error) {
                     suggestedActions.push(`Audio analysis failed: ${audioAnalysis.details}`);
                 }
@@ -367,10 +316,19 @@ router.post('/analyze', requireAuth, upload.fields([
                     }
                 };
                 
+                // Record which model versions produced this analysis, e.g. "text:v1.0,image:v1.1"
+                const modelVersions = [
+                    ['text', textAnalysis],
+                    ['image', imageAnalysis],
+                    ['audio', audioAnalysis]
+                ]
+                    .filter(([, analysis]) => analysis && analysis.model_version)
+                    .map(([type, analysis]) => `${type}:${analysis.model_version}`);
+                
                 healthLog.aiAnalysis = {
                     status: 'completed',
                     results: structuredResults,
-                    modelVersion: 'v1.0-real',
+                    modelVersion: modelVersions.length > 0 ? modelVersions.join(',') : 'v1.0-real',
                     processingTime: Date.now() - healthLog.createdAt.getTime()
                 };
                 
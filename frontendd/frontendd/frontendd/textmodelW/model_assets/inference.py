@@ -2,9 +2,27 @@
 import torch
 import joblib
 import json
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
 from transformers import AutoTokenizer, AutoModel
 from sklearn.preprocessing import LabelEncoder
-import re
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from model_runtime.torch_graphs import load_weights, compiled_cache_path, build_graph
+from model_runtime import keyword_triage
+
+class LogitsOnly(torch.nn.Module):
+    # traceable wrapper exposing only the logits of the (loss, logits) forward
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, input_ids, attention_mask):
+        _, logits = self.model(input_ids=input_ids, attention_mask=attention_mask)
+        return logits
 
 class DogDiseaseClassifier:
     def __init__(self, model_assets_path):
@@ -18,8 +36,16 @@ class DogDiseaseClassifier:
         # load label encoder
         self.label_encoder = joblib.load(f'{model_assets_path}/label_encoder.pkl')
         
-        # load tokenizer
-        self.tokenizer = AutoTokenizer.from_pretrained(f'{model_assets_path}/tokenizer')
+        # load tokenizer, requiring the Rust-backed fast implementation
+        self.tokenizer = AutoTokenizer.from_pretrained(f'{model_assets_path}/tokenizer', use_fast=True)
+        if not self.tokenizer.is_fast:
+            raise RuntimeError("Fast tokenizer unavailable; install the tokenizers package")
+        
+        # bounded LRU cache of encoded tensors keyed by normalized clinical text
+        self.tokenization_cache = OrderedDict()
+        self.tokenization_cache_size = self.config.get("tokenization_cache_size", 1024)
+        self.tokenization_lock = threading.Lock()
+        self.tokenization_metrics = {'hits': 0, 'misses': 0, 'tokenize_seconds': 0.0}
         
         # load treatment suggestions
         with open(f'{model_assets_path}/treatment_suggestions.json', 'r') as f:
@@ -29,12 +55,36 @@ class DogDiseaseClassifier:
         with open(f'{model_assets_path}/severity_levels.json', 'r') as f:
             self.severity_levels = json.load(f)
         
-        # initialize model
-        self.model = self._create_model()
-        self.model.load_state_dict(torch.load(f'{model_assets_path}/dog_disease_model.pth', 
-                                            map_location=self.device))
-        self.model.to(self.device)
-        self.model.eval()
+        # loading (or graph-compiling) the model and warming it up so no request pays the first-call cost
+        self.compiled_model = self._compile_model()
+    
+    def _load_model(self):
+        model = self._create_model()
+        model.load_state_dict(load_weights(f'{self.model_assets_path}/dog_disease_model.pth', self.device))
+        model.to(self.device)
+        return LogitsOnly(model.eval()).eval()
+    
+    def _compile_model(self):
+        # execution_mode in model_config.json; see model_runtime.torch_graphs.build_graph
+        mode = self.config.get("execution_mode", "eager")
+        warmup = self.tokenizer(
+            "warm-up",
+            truncation=True,
+            padding='max_length',
+            max_length=self.config["max_length"],
+            return_tensors='pt'
+        )
+        example = (warmup['input_ids'].to(self.device), warmup['attention_mask'].to(self.device))
+        
+        cache_path = compiled_cache_path(self.model_assets_path, 'dog_disease_model.pth', self.device)
+        compiled = build_graph(mode, cache_path, self._load_model, example, self.device, strict=False)
+        
+        # warm-up passes over the padded input shape every request uses
+        with torch.no_grad():
+            for _ in range(self.config.get("warmup_iterations", 2)):
+                compiled(*example)
+        
+        return compiled
     
     def _create_model(self):
         model_assets_path = self.model_assets_path
@@ -90,81 +140,127 @@ class DogDiseaseClassifier:
             return self.treatment_suggestions['default']
     
     def calculate_symptom_severity(self, symptoms_text):
-        symptom_text_lower = symptoms_text.lower()
-        severity_score = 1
-        
-        # critical indicators 
-        critical_indicators = [
-            'unconscious', 'seizure', 'paralysis', 'collapse', 
-            'pale gums', 'bloat', 'distended abdomen', 'difficulty breathing'
-        ]
-        
-        # severe indicators 
-        severe_indicators = [
-            'bleeding', 'vomiting blood', 'bloody diarrhea', 'unable to stand',
-            'crying in pain', 'swollen abdomen', 'high fever'
-        ]
-        
-        # moderate indicators
-        moderate_indicators = [
-            'vomiting', 'diarrhea', 'lethargy', 'pain', 'limp', 'not eating',
-            'fever', 'coughing', 'whining', 'difficulty urinating'
-        ]
+        return keyword_triage.symptom_severity(symptoms_text, self.severity_levels)
+    
+    def assess_severity(self, symptom_text, breed=None, age=None, sex=None):
+        # keyword-only severity of the clinical description, available without running the model
+        return self._severity(self.build_clinical_text(symptom_text, breed, age, sex))
+    
+    def _severity(self, clinical_text):
+        return keyword_triage.severity(clinical_text, self.severity_levels)
+    
+    def build_clinical_text(self, symptom_text, breed=None, age=None, sex=None):
+        return keyword_triage.clinical_text(symptom_text, breed, age, sex)
+    
+    @staticmethod
+    def normalize_text(text):
+        # the tokenizer splits on whitespace, so collapsing it never changes the encoding
+        return ' '.join(text.split())
+    
+    def encode_batch(self, texts):
+        # tokenizing only cache misses, in a single fast-tokenizer call, and returning stacked tensors
+        keys = [self.normalize_text(text) for text in texts]
+        encoded = {}
         
-        # check for critical indicators
-        for indicator in critical_indicators:
-            if re.search(r'\b' + re.escape(indicator) + r'\b', symptom_text_lower):
-                severity_score = max(severity_score, self.severity_levels['critical'])
+        with self.tokenization_lock:
+            for key in keys:
+                if key in self.tokenization_cache:
+                    self.tokenization_cache.move_to_end(key)
+                    encoded[key] = self.tokenization_cache[key]
         
-        # check for severe indicators
-        for indicator in severe_indicators:
-            if re.search(r'\b' + re.escape(indicator) + r'\b', symptom_text_lower):
-                severity_score = max(severity_score, self.severity_levels['severe'])
+        misses = list(dict.fromkeys(key for key in keys if key not in encoded))
+        elapsed = 0.0
+        if misses:
+            start = time.perf_counter()
+            encoding = self.tokenizer(
+                misses,
+                truncation=True,
+                padding='max_length',
+                max_length=self.config["max_length"],
+                return_tensors='pt'
+            )
+            elapsed = time.perf_counter() - start
+            # cloned so a cached row owns its storage instead of keeping the whole batch tensor alive
+            for i, key in enumerate(misses):
+                encoded[key] = (encoding['input_ids'][i].clone(), encoding['attention_mask'][i].clone())
         
-        # check for moderate indicators
-        for indicator in moderate_indicators:
-            if re.search(r'\b' + re.escape(indicator) + r'\b', symptom_text_lower):
-                severity_score = max(severity_score, self.severity_levels['moderate'])
+        with self.tokenization_lock:
+            self.tokenization_metrics['hits'] += len(keys) - len(misses)
+            self.tokenization_metrics['misses'] += len(misses)
+            self.tokenization_metrics['tokenize_seconds'] += elapsed
+            for key in misses:
+                self.tokenization_cache[key] = encoded[key]
+            while len(self.tokenization_cache) > self.tokenization_cache_size:
+                self.tokenization_cache.popitem(last=False)
         
-        return severity_score
+        input_ids = torch.stack([encoded[key][0] for key in keys])
+        attention_mask = torch.stack([encoded[key][1] for key in keys])
+        return input_ids, attention_mask
+    
+    def tokenization_stats(self):
+        with self.tokenization_lock:
+            metrics = dict(self.tokenization_metrics)
+            cache_size = len(self.tokenization_cache)
+        lookups = metrics['hits'] + metrics['misses']
+        return {
+            'fast_tokenizer': self.tokenizer.is_fast,
+            'cache_size': cache_size,
+            'cache_capacity': self.tokenization_cache_size,
+            'hits': metrics['hits'],
+            'misses': metrics['misses'],
+            'hit_rate': metrics['hits'] / lookups if lookups else 0.0,
+            'tokenize_seconds': metrics['tokenize_seconds'],
+            'avg_tokenize_ms': metrics['tokenize_seconds'] * 1000 / metrics['misses'] if metrics['misses'] else 0.0
+        }
     
     def predict(self, symptom_text, breed=None, age=None, sex=None, top_k=3):
+        return self.predict_batch([{
+            'symptom_text': symptom_text,
+            'breed': breed,
+            'age': age,
+            'sex': sex
+        }], top_k)[0]
+    
+    def predict_batch(self, items, top_k=3):
+        # scoring a list of {symptom_text, breed, age, sex} records in a single forward pass
         # validate top_k parameter
         if not isinstance(top_k, int) or top_k <= 0:
             top_k = 3  
         top_k = min(top_k, self.config["num_classes"])
         
         # clinical description
-        clinical_text = symptom_text
-        if breed:
-            clinical_text += f" Breed: {breed}"
-        if age:
-            clinical_text += f" Age: {age} years"
-        if sex:
-            clinical_text += f" Sex: {sex}"
-        
-        # tokenize input
-        encoding = self.tokenizer(
-            clinical_text,
-            truncation=True,
-            padding='max_length',
-            max_length=self.config["max_length"],
-            return_tensors='pt'
-        )
+        clinical_texts = [
+            self.build_clinical_text(item['symptom_text'], item.get('breed'), item.get('age'), item.get('sex'))
+            for item in items
+        ]
         
-        input_ids = encoding['input_ids'].to(self.device)
-        attention_mask = encoding['attention_mask'].to(self.device)
+        # tokenize input, served from the cache for repeated notes
+        input_ids, attention_mask = self.encode_batch(clinical_texts)
+        input_ids = input_ids.to(self.device)
+        attention_mask = attention_mask.to(self.device)
         
         # get prediction
         with torch.no_grad():
-            _, logits = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            logits = self.compiled_model(input_ids, attention_mask)
             probabilities = torch.softmax(logits, dim=1)
             top_probs, top_indices = torch.topk(probabilities, top_k)
         
+        top_probs = top_probs.cpu()
+        top_indices = top_indices.cpu()
+        
+        return [
+            self._format_result(item, clinical_text, top_probs[row], top_indices[row], top_k)
+            for row, (item, clinical_text) in enumerate(zip(items, clinical_texts))
+        ]
+    
+    def _format_result(self, item, clinical_text, top_probs, top_indices, top_k):
+        symptom_text = item['symptom_text']
+        breed, age, sex = item.get('breed'), item.get('age'), item.get('sex')
+        
         results = []
         for i in range(top_k):
-            disease = self.label_encoder.inverse_transform([top_indices[0][i].item()])[0]
-            prob = top_probs[0][i].item()
+            disease = self.label_encoder.inverse_transform([top_indices[i].item()])[0]
+            prob = top_probs[i].item()
             
             # generate confidence explanation
             if prob > 0.7:
@@ -190,16 +286,14 @@ class DogDiseaseClassifier:
             })
         
         # calculate severity
-        severity_score = self.calculate_symptom_severity(clinical_text)
-        score_to_level = {v: k for k, v in self.severity_levels.items()}
-        severity_level = score_to_level.get(severity_score, "unknown")        
+        severity = self._severity(clinical_text)
        
         # format comprehensive results
         result = {
             'symptoms': symptom_text,
             'demographics': {'breed': breed, 'age': age, 'sex': sex},
-            'severity': {'score': severity_score, 'level': severity_level},
-            'urgent_care': severity_score >= self.severity_levels['severe'],
+            'severity': {'score': severity['score'], 'level': severity['level']},
+            'urgent_care': severity['urgent_care'],
             'predictions': results,
             'top_disease': results[0]['disease'],
             'top_confidence': results[0]['confidence'],
@@ -207,4 +301,3 @@ class DogDiseaseClassifier:
         }
         
         return result
-
@@ -0,0 +1,210 @@
+const http = require('http');
+const https = require('https');
+const fs = require('fs');
+const path = require('path');
+const { PassThrough } = require('stream');
+const axios = require('axios');
+const busboy = require('busboy');
+
+// Flask AI service URL
+const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:5002';
+const AI_MAX_SOCKETS = parseInt(process.env.AI_MAX_SOCKETS || '16', 10);
+const AI_HEALTH_REFRESH_MS = parseInt(process.env.AI_HEALTH_REFRESH_MS || '15000', 10);
+const AI_MAX_UPLOAD_BYTES = parseInt(process.env.AI_MAX_UPLOAD_BYTES || String(25 * 1024 * 1024), 10);
+const AI_MAX_FILE_BYTES = parseInt(process.env.AI_MAX_FILE_BYTES || String(10 * 1024 * 1024), 10);
+// When set, forwarded uploads are also written here (into images/ and audio/) while they stream through
+const AI_UPLOAD_TEE_DIR = process.env.AI_UPLOAD_TEE_DIR || null;
+
+// Shared keep-alive agents so every call reuses pooled connections to the orchestrator
+const agentOptions = {
+    keepAlive: true,
+    keepAliveMsecs: 30000,
+    maxSockets: AI_MAX_SOCKETS,
+    maxFreeSockets: AI_MAX_SOCKETS
+};
+const httpAgent = new http.Agent(agentOptions);
+const httpsAgent = new https.Agent(agentOptions);
+
+const aiClient = axios.create({
+    baseURL: AI_SERVICE_URL,
+    httpAgent,
+    httpsAgent,
+    // Multipart bodies are streamed, so don't let axios cap or buffer them
+    maxBodyLength: Infinity,
+    maxContentLength: Infinity
+});
+
+// Cached availability, refreshed in the background instead of probed per request
+const availability = {
+    available: false,
+    checkedAt: null,
+    details: null,
+    error: null
+};
+
+let pendingRefresh = null;
+
+const refreshAvailability = () => {
+    if (pendingRefresh) return pendingRefresh;
+
+    pendingRefresh = aiClient.get('/health', { timeout: 5000 })
+        .then(response => {
+            availability.available = response.status === 200;
+            availability.details = response.data;
+            availability.error = null;
+        })
+        .catch(error => {
+            availability.available = false;
+            availability.details = error.response ? error.response.data : null;
+            availability.error = error.message;
+        })
+        .then(() => {
+            availability.checkedAt = new Date();
+            pendingRefresh = null;
+            return getAvailability();
+        });
+
+    return pendingRefresh;
+};
+
+const getAvailability = () => ({ ...availability });
+
+// Resolves from cache; only waits on a probe before the first check has completed
+const isAvailable = async () => {
+    if (!availability.checkedAt) {
+        await refreshAvailability();
+    }
+    return availability.available;
+};
+
+// Connection-level failures mark the service down until the next background refresh
+const markUnavailable = (error) => {
+    // Rejected uploads carry their own status and say nothing about the service
+    if (error && !error.response && !error.status) {
+        availability.available = false;
+        availability.error = error.message;
+        availability.checkedAt = new Date();
+    }
+};
+
+const uploadError = (message, status) => {
+    const error = new Error(message);
+    error.status = status;
+    return error;
+};
+
+const isAllowedUpload = (mimeType) => mimeType.startsWith('image/') || mimeType.startsWith('audio/');
+
+// Checks every file of a multipart stream as it passes through (images and audio only, at most
+// AI_MAX_FILE_BYTES each) and optionally writes them to disk, without buffering them; rejects at the first bad file
+const scanUpload = (source, headers, teeDir) => {
+    const writes = [];
+    const stored = [];
+
+    // Created inside the executor so a malformed multipart header rejects rather than throws
+    return new Promise((resolve, reject) => {
+        const parser = busboy({ headers, limits: { fileSize: AI_MAX_FILE_BYTES } });
+        let failed = false;
+        const fail = (error) => {
+            if (failed) return;
+            failed = true;
+            source.unpipe(parser);
+            Promise.all(writes).then(() => stored.forEach(file => fs.unlink(file.path, () => {})));
+            reject(error);
+        };
+
+        parser.on('file', (fieldname, stream, info) => {
+            if (!isAllowedUpload(info.mimeType)) {
+                stream.resume();
+                fail(uploadError('Only image and audio files are allowed', 415));
+                return;
+            }
+            stream.on('limit', () => fail(uploadError(`File too large: ${info.filename} exceeds ${AI_MAX_FILE_BYTES} bytes`, 413)));
+
+            if (!teeDir) {
+                stream.resume();
+                return;
+            }
+
+            const subdir = info.mimeType.startsWith('audio/') ? 'audio' : 'images';
+            const uniqueSuffix = Date.now() + '-' + Math.round(Math.random() * 1E9);
+            const filename = fieldname + '-' + uniqueSuffix + path.extname(info.filename || '');
+            const filePath = path.join(teeDir, subdir, filename);
+            fs.mkdirSync(path.dirname(filePath), { recursive: true });
+
+            const out = fs.createWriteStream(filePath);
+            writes.push(new Promise(resolveWrite => {
+                out.on('close', resolveWrite);
+                out.on('error', resolveWrite);
+            }));
+            stream.pipe(out);
+            stored.push({ fieldname, filename, originalName: info.filename, path: filePath, mimeType: info.mimeType });
+        });
+
+        parser.on('close', () => Promise.all(writes).then(() => {
+            if (!failed) resolve(stored);
+        }));
+        parser.on('error', (error) => fail(uploadError(`Malformed upload: ${error.message}`, 400)));
+
+        source.pipe(parser);
+    });
+};
+
+// Pipes an incoming multipart request body to the orchestrator as-is instead of spooling and re-encoding it
+const forwardMultipart = async (req, aiPath, options = {}) => {
+    const contentType = req.headers['content-type'] || '';
+    const contentLength = parseInt(req.headers['content-length'], 10);
+
+    if (!contentType.startsWith('multipart/form-data')) {
+        throw uploadError('Expected multipart/form-data', 400);
+    }
+    if (!Number.isFinite(contentLength)) {
+        throw uploadError('Content-Length is required for uploads', 411);
+    }
+    if (contentLength > AI_MAX_UPLOAD_BYTES) {
+        throw uploadError('Upload too large', 413);
+    }
+
+    // Both consumers are attached before any data flows so neither misses the first chunks
+    const upstream = new PassThrough();
+    req.pipe(upstream);
+
+    const scanned = scanUpload(req, req.headers, options.teeDir || AI_UPLOAD_TEE_DIR);
+    // A rejected file aborts the forward, so the orchestrator never gets the rest of the body
+    scanned.catch((error) => {
+        req.unpipe(upstream);
+        upstream.destroy(error);
+        req.resume();
+    });
+
+    const forwarded = aiClient.post(aiPath, upstream, {
+        headers: {
+            'content-type': contentType,
+            'content-length': contentLength,
+            // The body is the client's own, so its dog_id field is unverified; an empty header tells the
+            // orchestrator to ignore it rather than file history and cached results under that dog
+            'x-verified-dog-id': ''
+        },
+        params: options.params,
+        // 'stream' hands back the response body unread, for piping progressive results through
+        responseType: options.responseType || 'json'
+    });
+
+    // The response is only used once every file has passed the checks
+    const [response, storedFiles] = await Promise.all([forwarded, scanned]);
+    return { response, storedFiles };
+};
+
+refreshAvailability();
+const refreshTimer = setInterval(refreshAvailability, AI_HEALTH_REFRESH_MS);
+refreshTimer.unref();
+
+module.exports = {
+    AI_SERVICE_URL,
+    aiClient,
+    forwardMultipart,
+    getAvailability,
+    isAvailable,
+    markUnavailable,
+    refreshAvailability
+};